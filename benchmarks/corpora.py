@@ -0,0 +1,126 @@
+import json
+import random
+from typing import Dict, List, Optional
+
+from hackq_trivia.recorder import read_session
+
+WORDS = (
+    "the of and to in is was for on that by with as at from his her which "
+    "peninsula florida water island ocean coast river mountain city state "
+    "country history war president century king queen empire army battle "
+    "music album song band film movie actor actress director novel author "
+    "book books poem poet painting artist museum science chemistry physics "
+    "element planet star galaxy species animal animals bird fish plant tree "
+    "basketball football baseball soccer tennis court game games player team "
+    "network news netflix television channel company brand product market"
+).split()
+
+CHOICES = [
+    ["Peninsula", "Pinata", "Trifecta"],
+    ["Basketball", "Super Mario Kart", "Uno"],
+    ["News", "Netflix", "Network"],
+]
+
+QUESTIONS = [
+    "What is the word for a landmass like Florida that is surrounded on "
+    "three sides by water?",
+    "Which of these games is played on a court?",
+    'What do NEITHER of the N\'s in CNN stand for in "Cable News Network"?',
+]
+
+
+def synthetic_text(num_words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(num_words))
+
+
+def synthetic_html(num_words: int, rng: random.Random) -> str:
+    """
+    Returns an HTML page with roughly num_words visible words, split into
+    paragraphs and interleaved with scripts, styles and entities.
+    """
+    parts = [
+        "<!DOCTYPE html><html><head><title>Synthetic page</title>",
+        "<style>body { font-family: sans-serif; } .x { color: red; }</style>",
+        "<script>var data = {a: 1, b: [1, 2, 3]};</script></head><body>",
+    ]
+    remaining = num_words
+    while remaining > 0:
+        paragraph_len = min(remaining, rng.randint(20, 80))
+        remaining -= paragraph_len
+        text = synthetic_text(paragraph_len, rng).replace(" and ", " &amp; ", 1)
+        parts.append(f'<div class="x"><p>{text}</p></div>')
+        if rng.random() < 0.1:
+            parts.append("<script>console.log('tracking');</script>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def synthetic_frames(num_frames: int, rng: random.Random) -> List[str]:
+    frames = []
+    for i in range(num_frames):
+        if i % 10 == 0:
+            question_num = i // 10 % len(QUESTIONS)
+            frame = {
+                "type": "question",
+                "questionNumber": question_num + 1,
+                "questionCount": 12,
+                "question": QUESTIONS[question_num],
+                "answers": [
+                    {"answerId": j, "text": choice}
+                    for j, choice in enumerate(CHOICES[question_num])
+                ],
+            }
+        else:
+            frame = {
+                "type": "interaction",
+                "itemId": "chat",
+                "metadata": {
+                    "userId": rng.randint(1, 10**7),
+                    "username": f"user{rng.randint(1, 10**5)}",
+                    "message": synthetic_text(rng.randint(1, 12), rng),
+                },
+            }
+        frames.append(json.dumps(frame))
+    return frames
+
+
+def build_corpora(recording: Optional[str] = None, seed: int = 0) -> Dict:
+    """
+    Builds the inputs used by the benchmarks.
+    :param recording: Optional recorded session file or pattern (see recorder)
+                      whose fetched pages and websocket frames are added
+    :param seed: Seed for the synthetic corpora
+    :return: Dict with "html", "frames" and "questions" corpora keyed by corpus name
+    """
+    rng = random.Random(seed)
+
+    corpora = {
+        "html": {
+            f"synthetic_{size}w": [synthetic_html(size, rng) for _ in range(5)]
+            for size in (500, 5000, 50000)
+        },
+        "frames": {"synthetic": synthetic_frames(500, rng)},
+        "questions": {"synthetic": list(zip(QUESTIONS, CHOICES))},
+    }
+
+    if recording:
+        pages, frames = [], []
+        questions = []
+        for record in read_session(recording):
+            if record["kind"] == "fetch" and record.get("text"):
+                pages.append(record["text"])
+            elif record["kind"] == "ws":
+                frames.append(record["data"])
+                message = json.loads(record["data"])
+                if message.get("type") == "question":
+                    choices = [answer["text"] for answer in message["answers"]]
+                    questions.append((message["question"], choices))
+
+        if pages:
+            corpora["html"]["recorded"] = pages
+        if frames:
+            corpora["frames"]["recorded"] = frames
+        if questions:
+            corpora["questions"]["recorded"] = questions
+
+    return corpora
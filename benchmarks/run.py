@@ -0,0 +1,198 @@
+"""
+Offline micro-benchmarks of the answering hot path.
+
+Usage (from the HackQ-Trivia folder):
+    python -m benchmarks.run --save-baseline     # record a baseline
+    python -m benchmarks.run                     # compare against it
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import timeit
+from typing import Callable, Dict, List
+
+from hackq_trivia.question_handler import QuestionHandler
+from hackq_trivia.scoring import ScoringContext, get_best_answer, method1, method2
+from hackq_trivia.searcher import Searcher, VisibleTextParser
+
+from benchmarks.corpora import build_corpora
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """
+    Returns the best time per call of func in seconds.
+    Each repetition calls func enough times to take at least 0.2 seconds.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def stream_visible_text(html: str, chunk_size: int = Searcher.STREAM_CHUNK_SIZE):
+    # mirrors Searcher.stream_visible_text without the network
+    parser = VisibleTextParser()
+    pieces = [
+        parser.feed_text(html[i : i + chunk_size])
+        for i in range(0, len(html), chunk_size)
+    ]
+    return "".join(pieces) + parser.close_text()
+
+
+def split_choices(qh: QuestionHandler, original_choices: List[str]):
+    # mirrors QuestionHandler.answer_question
+    choice_groups = [
+        [
+            choice.translate(qh.punctuation_to_none),
+            choice.translate(qh.punctuation_to_space),
+        ]
+        for choice in original_choices
+    ]
+    return sum(choice_groups, []), choice_groups
+
+
+def build_benchmarks(qh: QuestionHandler, corpora: Dict) -> Dict[str, Callable]:
+    benchmarks = {}
+
+    for name, frames in corpora["frames"].items():
+        benchmarks[f"ws_json_decode/{name}"] = lambda frames=frames: [
+            json.loads(frame) for frame in frames
+        ]
+
+    for name, questions in corpora["questions"].items():
+        benchmarks[f"find_keywords/{name}"] = lambda questions=questions: [
+            qh.find_keywords(question) for question, _ in questions
+        ]
+
+    questions = corpora["questions"]["synthetic"]
+    for name, pages in corpora["html"].items():
+        benchmarks[f"html_to_visible_text/{name}"] = lambda pages=pages: [
+            Searcher.html_to_visible_text(html) for html in pages
+        ]
+        benchmarks[f"visible_text_parser/{name}"] = lambda pages=pages: [
+            stream_visible_text(html) for html in pages
+        ]
+
+        texts = [
+            qh.prepare_text(
+                Searcher.html_to_visible_text(html).translate(qh.punctuation_to_none)
+            )
+            for html in pages
+        ]
+        split = [split_choices(qh, choices) for _, choices in questions]
+
+        # artifacts are rebuilt on every call, as they are for every question
+        for method in (method1, method2):
+            benchmarks[f"{method.__name__}/{name}"] = (
+                lambda method=method, texts=texts, split=split: [
+                    method(ScoringContext(texts, choices, choice_groups, False, qh))
+                    for choices, choice_groups in split
+                ]
+            )
+
+        counts = [
+            {choice: texts[0].count(qh.search_term(choice)) for choice in choices}
+            for choices, _ in split
+        ]
+        benchmarks[f"get_best_answer/{name}"] = lambda counts=counts, split=split: [
+            get_best_answer(choice_counts, choice_groups, False)
+            for choice_counts, (_, choice_groups) in zip(counts, split)
+        ]
+
+    return benchmarks
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float):
+    """
+    Returns descriptions of all benchmarks that are slower than their baseline
+    by more than threshold (e.g. 0.25 for 25%).
+    """
+    regressions = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {seconds * 1000:.3f} ms vs. baseline "
+                f"{baseline[name] * 1000:.3f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+async def create_question_handler() -> QuestionHandler:
+    qh = QuestionHandler()
+    # keep benchmark runs from touching the domain stats file
+    qh.searcher.domain_tracker.path = None
+    return qh
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="baseline results JSON file"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write the results to the baseline file instead of comparing",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="fail if a benchmark is slower than its baseline by this fraction",
+    )
+    parser.add_argument(
+        "--recording", help="recorded session file or pattern to add as a corpus"
+    )
+    parser.add_argument("--filter", default="", help="only run matching benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    qh = loop.run_until_complete(create_question_handler())
+    try:
+        benchmarks = build_benchmarks(qh, build_corpora(args.recording))
+        results = {}
+        for name, func in benchmarks.items():
+            if args.filter not in name:
+                continue
+            results[name] = time_call(func, args.repeat)
+            print(f"{name:50} {results[name] * 1000:10.3f} ms")
+    finally:
+        loop.run_until_complete(qh.close())
+        loop.close()
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        return 1
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import json
+import logging
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from anyascii import anyascii
+
+from hackq_trivia.config import config
+from hackq_trivia.hq_main import download_nltk_resources, init_root_logger
+from hackq_trivia.profiler import QuestionProfiler
+from hackq_trivia.question_handler import QuestionHandler
+
+
+class BatchQuestion:
+    def __init__(self, question: str, choices: List[str], answer: Optional[str] = None):
+        self.question = question
+        self.choices = choices
+        self.answer = answer
+
+
+class BatchResult:
+    def __init__(
+        self,
+        question: BatchQuestion,
+        answers: List[str],
+        latency: float,
+        error: Optional[str] = None,
+    ):
+        self.question = question
+        self.answers = answers
+        self.latency = latency
+        self.error = error  # set if answering the question raised an exception
+
+
+def load_questions(path: str) -> List[BatchQuestion]:
+    """
+    Loads questions from a JSONL file.
+    Each line must be an object with "question" and "choices" keys,
+    and may contain an "answer" key with the text of the correct choice.
+    :param path: Path of the JSONL file
+    :return: List of questions in file order
+    """
+    questions = []
+    with open(path, encoding="utf-8") as questions_file:
+        for line_num, line in enumerate(questions_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+
+            entry = json.loads(line)
+            try:
+                question = anyascii(entry["question"])
+                choices = [anyascii(choice) for choice in entry["choices"]]
+            except KeyError as e:
+                raise ValueError(f"Line {line_num} of {path} is missing {e}") from e
+
+            answer = entry.get("answer")
+            if answer is not None:
+                answer = anyascii(answer)
+                if answer not in choices:
+                    raise ValueError(
+                        f"Line {line_num} of {path}: answer {answer} not in choices"
+                    )
+
+            questions.append(BatchQuestion(question, choices, answer))
+
+    return questions
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Returns the pct-th percentile of values using linear interpolation.
+    :param values: Values to analyze, must not be empty
+    :param pct: Percentile between 0 and 100
+    :return: Interpolated percentile value
+    """
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def summarize(
+    results: List[BatchResult],
+    method_names: List[str],
+    normalize_answer,
+    elapsed: float,
+) -> Dict:
+    """
+    Computes accuracy per method, throughput and latency distribution.
+    Failed questions count as incorrect and are left out of the latencies.
+    :param results: Results of the batch run
+    :param method_names: Names of the search methods, in the order answers are returned
+    :param normalize_answer: Function converting a choice to the form answers are returned in
+    :param elapsed: Wall time of the whole batch in seconds
+    :return: Dict of summary statistics
+    """
+    graded = [result for result in results if result.question.answer is not None]
+    answered = [result for result in results if result.error is None]
+    graded_answered = [result for result in graded if result.error is None]
+
+    accuracy = {}
+    for i, name in enumerate(method_names):
+        correct = sum(
+            result.answers[i] == normalize_answer(result.question.answer)
+            for result in graded_answered
+        )
+        ties = sum(not result.answers[i] for result in graded_answered)
+        accuracy[name] = {
+            "correct": correct,
+            "ties": ties,
+            "accuracy": correct / len(graded) if graded else None,
+        }
+
+    latencies = [result.latency for result in answered]
+    latency = {}
+    if latencies:
+        latency = {
+            "mean": sum(latencies) / len(latencies),
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+        }
+
+    return {
+        "questions": len(results),
+        "graded": len(graded),
+        "failed": len(results) - len(answered),
+        "elapsed": elapsed,
+        "throughput": len(results) / elapsed if elapsed > 0 else 0.0,
+        "accuracy": accuracy,
+        "latency": latency,
+    }
+
+
+async def run_batch(
+    questions: List[BatchQuestion],
+    concurrency: int,
+    num_sites: Optional[int] = None,
+) -> Dict:
+    """
+    Answers all questions with one QuestionHandler, sharing its sessions.
+    :param questions: Questions to answer
+    :param concurrency: Maximum number of questions answered at the same time
+    :param num_sites: Overrides NumSitesToSearch if not None
+    :return: Dict of summary statistics, see summarize()
+    """
+    question_handler = QuestionHandler()
+    if num_sites is not None:
+        question_handler.num_sites = num_sites
+
+    semaphore = asyncio.Semaphore(concurrency)
+    logger = logging.getLogger(__name__)
+
+    profiler = QuestionProfiler()
+    if profiler.enabled and concurrency > 1:
+        # cProfile only supports one active profiler at a time
+        logger.warning("Profiling requires a concurrency of 1, disabling profiling")
+        profiler.enabled = False
+
+    async def answer(question_num: int, question: BatchQuestion) -> BatchResult:
+        async with semaphore:
+            start_time = perf_counter()
+            try:
+                with profiler.profile(question_num):
+                    answers = await question_handler.answer_question(
+                        question.question, question.choices
+                    )
+            except Exception as e:
+                # one failing question must not stop the rest of the batch
+                logger.exception(f"Question {question_num} failed: {question.question}")
+                return BatchResult(
+                    question,
+                    [],
+                    perf_counter() - start_time,
+                    f"{type(e).__name__}: {e}",
+                )
+            return BatchResult(question, answers, perf_counter() - start_time)
+
+    try:
+        start_time = perf_counter()
+        results = await asyncio.gather(
+            *(answer(i, q) for i, q in enumerate(questions, 1))
+        )
+        elapsed = perf_counter() - start_time
+    finally:
+        await question_handler.close()
+        profiler.log_summary()
+
+    method_names = [method.name for method in question_handler.search_methods_to_use]
+    return summarize(
+        results,
+        method_names,
+        lambda choice: choice.translate(question_handler.punctuation_to_none),
+        elapsed,
+    )
+
+
+def print_summary(summary: Dict) -> None:
+    logger = logging.getLogger(__name__)
+
+    logger.info(
+        f'Answered {summary["questions"]} questions '
+        f'({summary["graded"]} with known answers) '
+        f'in {round(summary["elapsed"], 2)} seconds'
+    )
+    logger.info(f'Throughput: {round(summary["throughput"], 2)} questions/second')
+    if summary["failed"]:
+        logger.warning(f'{summary["failed"]} questions failed with an error')
+
+    for name, stats in summary["accuracy"].items():
+        if stats["accuracy"] is None:
+            continue
+        logger.info(
+            f'{name}: {stats["correct"]}/{summary["graded"]} correct '
+            f'({round(stats["accuracy"] * 100, 1)}%), {stats["ties"]} ties'
+        )
+
+    if summary["latency"]:
+        logger.info(
+            "Latency: "
+            + ", ".join(
+                f"{key}={round(value, 2)}s" for key, value in summary["latency"].items()
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Answer a JSONL file of questions and report accuracy and speed."
+    )
+    parser.add_argument("questions", help="JSONL file of questions to answer")
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help="maximum number of questions answered at the same time (default: 4)",
+    )
+    parser.add_argument(
+        "-n",
+        "--num-sites",
+        type=int,
+        default=None,
+        help="number of sites to search, overrides NumSitesToSearch",
+    )
+    parser.add_argument(
+        "-o", "--output", default=None, help="write the summary to this JSON file"
+    )
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        parser.error("concurrency must be at least 1")
+
+    init_root_logger()
+    if config.getboolean("MAIN", "DownloadNLTKResources"):
+        download_nltk_resources()
+
+    questions = load_questions(args.questions)
+    summary = asyncio.run(run_batch(questions, args.concurrency, args.num_sites))
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(summary, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
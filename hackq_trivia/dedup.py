@@ -0,0 +1,60 @@
+import heapq
+from typing import List
+
+SHINGLE_SIZE = 3
+SKETCH_SIZE = 128
+
+
+def fingerprint(
+    text: str, shingle_size: int = SHINGLE_SIZE, sketch_size: int = SKETCH_SIZE
+) -> List[int]:
+    """
+    Returns a bottom-k MinHash sketch of the word shingles of text.
+    Runs in linear time, hashing is done by the interpreter in C.
+    Hashes are only comparable within the same process.
+    :param text: Whitespace separated text
+    :param shingle_size: Number of consecutive words per shingle
+    :param sketch_size: Number of smallest shingle hashes to keep
+    :return: Sorted list of at most sketch_size hashes, empty if text is empty
+    """
+    tokens = text.split()
+    if not tokens:
+        return []
+    if len(tokens) < shingle_size:
+        return [hash(tuple(tokens))]
+
+    shingles = zip(*(tokens[i:] for i in range(shingle_size)))
+    return heapq.nsmallest(sketch_size, set(map(hash, shingles)))
+
+
+def similarity(a: List[int], b: List[int], sketch_size: int = SKETCH_SIZE) -> float:
+    """
+    Estimates the Jaccard similarity of the shingle sets of two fingerprints.
+    :return: Value between 0 and 1, 0 if either fingerprint is empty
+    """
+    if not a or not b:
+        return 0.0
+
+    set_a, set_b = set(a), set(b)
+    union_sketch = heapq.nsmallest(sketch_size, set_a | set_b)
+    shared = sum(1 for h in union_sketch if h in set_a and h in set_b)
+    return shared / len(union_sketch)
+
+
+def find_near_duplicates(texts: List[str], threshold: float) -> List[int]:
+    """
+    Finds texts that are near-duplicates of an earlier text, e.g. mirrors
+    of the same article.
+    :param texts: Texts in order of preference
+    :param threshold: Minimum estimated Jaccard similarity of duplicates
+    :return: Indices of texts that duplicate an earlier, kept text
+    """
+    kept: List[List[int]] = []
+    duplicates = []
+    for i, text in enumerate(texts):
+        sketch = fingerprint(text)
+        if any(similarity(sketch, other) >= threshold for other in kept):
+            duplicates.append(i)
+        else:
+            kept.append(sketch)
+    return duplicates
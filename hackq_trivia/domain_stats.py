@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+from time import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+def url_domain(url: str) -> str:
+    """
+    Returns the domain of a URL, lowercased and without a leading www.
+    :param url: URL to parse
+    :return: Domain of the URL, empty string if there is none
+    """
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain
+
+
+class DomainStats:
+    def __init__(
+        self,
+        requests: int = 0,
+        latency: Optional[float] = None,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        usefulness: Optional[float] = None,
+        opened_at: Optional[float] = None,
+    ):
+        self.requests = requests
+        self.latency = latency  # EWMA of successful fetch time in seconds
+        self.error_rate = error_rate  # EWMA of errors, incl. HTTP error statuses
+        self.timeout_rate = timeout_rate  # EWMA of timeouts
+        self.usefulness = usefulness  # EWMA of question keywords found in page text
+        self.opened_at = opened_at  # Time the circuit breaker opened, if open
+
+    @property
+    def failure_rate(self) -> float:
+        return self.error_rate + self.timeout_rate
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DomainStats":
+        return cls(**data)
+
+
+class DomainTracker:
+    """
+    Keeps per-domain fetch statistics and circuit breaks domains that fail often.
+    A broken domain is skipped until the cooldown passes, after which a single
+    successful fetch closes the circuit again.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        alpha: float,
+        failure_threshold: float,
+        min_requests: int,
+        cooldown: float,
+    ):
+        self.path = path
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+
+        self.stats: Dict[str, DomainStats] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as stats_file:
+                data = json.load(stats_file)
+            self.stats = {
+                domain: DomainStats.from_dict(stats) for domain, stats in data.items()
+            }
+        except (ValueError, TypeError) as e:
+            self.logger.warning(f"Could not load domain stats from {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+
+        with open(self.path, "w") as stats_file:
+            json.dump(
+                {domain: stats.to_dict() for domain, stats in self.stats.items()},
+                stats_file,
+                indent=1,
+                sort_keys=True,
+            )
+
+    def _get(self, url: str) -> DomainStats:
+        return self.stats.setdefault(url_domain(url), DomainStats())
+
+    def _ewma(self, old: Optional[float], new: float) -> float:
+        if old is None:
+            return new
+        return self.alpha * new + (1 - self.alpha) * old
+
+    def is_available(self, url: str) -> bool:
+        """
+        Returns False if the URL's domain is circuit broken and still cooling down.
+        """
+        stats = self.stats.get(url_domain(url))
+        if stats is None or stats.opened_at is None:
+            return True
+
+        return time() - stats.opened_at >= self.cooldown
+
+    def record_success(self, url: str, latency: float) -> None:
+        stats = self._get(url)
+        stats.requests += 1
+        stats.latency = self._ewma(stats.latency, latency)
+        stats.error_rate = self._ewma(stats.error_rate, 0.0)
+        stats.timeout_rate = self._ewma(stats.timeout_rate, 0.0)
+        stats.opened_at = None
+
+    def record_error(self, url: str) -> None:
+        stats = self._get(url)
+        stats.requests += 1
+        stats.error_rate = self._ewma(stats.error_rate, 1.0)
+        stats.timeout_rate = self._ewma(stats.timeout_rate, 0.0)
+        self._check_circuit(url, stats)
+
+    def record_timeout(self, url: str) -> None:
+        stats = self._get(url)
+        stats.requests += 1
+        stats.error_rate = self._ewma(stats.error_rate, 0.0)
+        stats.timeout_rate = self._ewma(stats.timeout_rate, 1.0)
+        self._check_circuit(url, stats)
+
+    def record_usefulness(self, url: str, usefulness: float) -> None:
+        stats = self._get(url)
+        stats.usefulness = self._ewma(stats.usefulness, usefulness)
+
+    def _check_circuit(self, url: str, stats: DomainStats) -> None:
+        half_open = stats.opened_at is not None
+        if half_open or (
+            stats.requests >= self.min_requests
+            and stats.failure_rate >= self.failure_threshold
+        ):
+            if not half_open:
+                self.logger.debug(f"Circuit breaking {url_domain(url)}")
+            stats.opened_at = time()
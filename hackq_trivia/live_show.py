@@ -7,22 +7,33 @@ import colorama
 from anyascii import anyascii
 
 from hackq_trivia.config import config
+from hackq_trivia.profiler import QuestionProfiler
 from hackq_trivia.question_handler import QuestionHandler
+from hackq_trivia.recorder import SessionRecorder
 
 
 class LiveShow:
     async def __aenter__(self):
-        self.question_handler = QuestionHandler()
+        self.question_handler = QuestionHandler(self.recorder)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.question_handler.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.profiler.log_summary()
 
     def __init__(self, headers):
         self.headers = headers
         self.show_question_summary = config.getboolean("LIVE", "ShowQuestionSummary")
         self.show_chat = config.getboolean("LIVE", "ShowChat")
         self.block_chat = False  # Block chat while question is active
+        self.profiler = QuestionProfiler()
+        self.recorder = (
+            SessionRecorder.from_config()
+            if config.getboolean("RECORDING", "Enabled")
+            else None
+        )
         self.logger = logging.getLogger(__name__)
         self.logger.info("LiveShow initialized.")
 
@@ -36,9 +47,12 @@ class LiveShow:
                     # suppress incorrect type warning for msg in PyCharm
                     if msg.type != aiohttp.WSMsgType.TEXT:  # noqa
                         continue
+                    if self.recorder is not None:
+                        self.recorder.record("ws", data=msg.data)  # noqa
                     message = json.loads(msg.data)  # noqa
 
-                    await self.handle_msg(message)
+                    with self.question_handler.loop_monitor.stage("websocket"):
+                        await self.handle_msg(message)
 
                     rejoin = self.should_rejoin(message)
                     if rejoin:
@@ -91,7 +105,8 @@ class LiveShow:
                 f'Choices: {", ".join(choices)}', extra={"pre": colorama.Fore.BLUE}
             )
 
-            await self.question_handler.answer_question(question, choices)
+            with self.profiler.profile(message["questionNumber"]):
+                await self.question_handler.answer_question(question, choices)
 
             self.block_chat = True
 
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from hackq_trivia.config import config
+
+
+class Stall:
+    def __init__(self, duration: float, stage: str, detail: str = ""):
+        self.duration = duration
+        self.stage = stage
+        self.detail = detail
+
+    def __str__(self):
+        detail = f", {self.detail}" if self.detail else ""
+        return f"{round(self.duration, 3)}s ({self.stage}{detail})"
+
+
+class SlowCallbackFilter(logging.Filter):
+    """
+    Turns asyncio's slow callback warnings into stalls of a LoopLagMonitor.
+    """
+
+    def __init__(self, monitor: "LoopLagMonitor"):
+        super().__init__()
+        self.monitor = monitor
+
+    def filter(self, record):
+        # asyncio logs "Executing %s took %.3f seconds" in debug mode
+        if (
+            isinstance(record.msg, str)
+            and record.msg.startswith("Executing")
+            and isinstance(record.args, tuple)
+            and len(record.args) == 2
+        ):
+            handle, duration = record.args
+            self.monitor.add_stall(duration, str(handle)[:200])
+        return True
+
+
+class LoopLagMonitor:
+    """
+    Measures how late a periodic task is scheduled on the event loop.
+    Long synchronous stretches (parsing, scoring, logging) delay it, and with it
+    websocket frames and heartbeats. Each stall is tagged with the pipeline
+    stages (see stage()) that were active while it happened. Stages of
+    concurrent tasks (e.g. batch_eval --concurrency) are counted separately.
+    """
+
+    def __init__(self):
+        self.enabled = config.getboolean("MONITOR", "Enabled")
+        self.interval = config.getfloat("MONITOR", "Interval")
+        self.stall_threshold = config.getfloat("MONITOR", "StallThreshold")
+        self.num_stalls_to_show = config.getint("MONITOR", "NumStallsToShow")
+        self.slow_callbacks = config.getboolean("MONITOR", "SlowCallbacks")
+
+        self.active_stages: Counter = Counter()
+        self.stalls: List[Stall] = []
+        self.max_lag = 0.0
+
+        self._tick_stages: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._slow_callback_filter: Optional[SlowCallbackFilter] = None
+        self._previous_debug: Optional[Tuple[bool, float]] = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> None:
+        """
+        Starts monitoring the running event loop, does nothing if already started.
+        """
+        if not self.enabled or self._task is not None:
+            return
+
+        loop = asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+
+        if self.slow_callbacks:
+            self._previous_debug = (loop.get_debug(), loop.slow_callback_duration)
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.stall_threshold
+            self._slow_callback_filter = SlowCallbackFilter(self)
+            logging.getLogger("asyncio").addFilter(self._slow_callback_filter)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._slow_callback_filter is not None:
+            logging.getLogger("asyncio").removeFilter(self._slow_callback_filter)
+            self._slow_callback_filter = None
+
+        if self._previous_debug is not None:
+            loop = asyncio.get_event_loop()
+            loop.set_debug(self._previous_debug[0])
+            loop.slow_callback_duration = self._previous_debug[1]
+            self._previous_debug = None
+
+    @property
+    def current_stage(self) -> str:
+        """
+        Stages that are active right now, "idle" if there are none.
+        """
+        return "/".join(self.active_stages) or "idle"
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            self._tick_stages = list(self.active_stages)
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+
+            lag = loop.time() - expected
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.stall_threshold:
+                self.add_stall(lag)
+
+    def add_stall(self, duration: float, detail: str = "") -> None:
+        stages = dict.fromkeys(self._tick_stages + list(self.active_stages))
+        self.stalls.append(Stall(duration, "/".join(stages) or "idle", detail))
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Marks the code run inside the context as belonging to a pipeline stage.
+        """
+        self.active_stages[name] += 1
+        self._tick_stages.append(name)
+        try:
+            yield
+        finally:
+            self.active_stages[name] -= 1
+            if not self.active_stages[name]:
+                del self.active_stages[name]
+
+    def pop_stalls(self) -> List[Stall]:
+        """
+        Returns the stalls since the last call, worst first, and resets them.
+        """
+        stalls = sorted(self.stalls, key=lambda stall: stall.duration, reverse=True)
+        self.stalls = []
+        self.max_lag = 0.0
+        return stalls
+
+    def log_stalls(self) -> None:
+        """
+        Logs the worst stalls since the last call.
+        """
+        if not self.enabled:
+            return
+
+        max_lag = self.max_lag
+        stalls = self.pop_stalls()
+        if not stalls:
+            self.logger.debug(f"Max event loop lag: {round(max_lag, 3)}s")
+            return
+
+        worst = ", ".join(str(stall) for stall in stalls[: self.num_stalls_to_show])
+        self.logger.info(f"Event loop stalled {len(stalls)} times, worst: {worst}")
@@ -0,0 +1,136 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import strftime
+from typing import Callable, Iterator, List, Optional, TypeVar
+
+from hackq_trivia.config import config
+
+T = TypeVar("T")
+
+# profiles of executor calls made while answering the profiled question
+_worker_profiles: ContextVar[Optional[List[cProfile.Profile]]] = ContextVar(
+    "worker_profiles", default=None
+)
+
+
+async def run_in_executor(func: Callable[..., T], *args) -> T:
+    """
+    Runs func in the event loop's default executor.
+    cProfile only profiles the thread that enabled it, so while a question is
+    being profiled, func is profiled in the worker thread and added to the
+    question's profile.
+    :return: Result of func(*args)
+    """
+    loop = asyncio.get_event_loop()
+    profiles = _worker_profiles.get()
+    if profiles is None:
+        return await loop.run_in_executor(None, func, *args)
+    return await loop.run_in_executor(None, _profile_call, profiles, func, args)
+
+
+def _profile_call(profiles: List[cProfile.Profile], func: Callable[..., T], args) -> T:
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # since Python 3.12 the question's profiler already sees every thread
+        return func(*args)
+
+    try:
+        return func(*args)
+    finally:
+        profile.disable()
+        profiles.append(profile)
+
+
+class QuestionProfiler:
+    """
+    Profiles each question with cProfile when enabled in the config.
+    Profiles are dumped to one file per question, named after the time the
+    profiler was created and the question number, so they can be inspected
+    later with pstats or snakeviz.
+    """
+
+    def __init__(self):
+        self.enabled = config.getboolean("PROFILING", "Enabled")
+        self.num_hotspots = config.getint("PROFILING", "NumHotspots")
+        self.sort_key = config.get("PROFILING", "SortBy")
+
+        profile_dir = config.get("PROFILING", "Directory")
+        if not os.path.isabs(profile_dir):
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            profile_dir = os.path.join(script_dir, profile_dir)
+        self.profile_dir = profile_dir
+
+        self.profile_files: List[str] = []
+        self.session = strftime("%Y%m%d-%H%M%S")
+        self.logger = logging.getLogger(__name__)
+
+        if self.enabled:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+    @contextmanager
+    def profile(self, question_num: int) -> Iterator[None]:
+        """
+        Profiles everything run inside the context, including other tasks
+        scheduled on the event loop while the question is being answered
+        and functions they pass to run_in_executor.
+        Does nothing if profiling is disabled.
+        :param question_num: Question number used to name the profile file
+        """
+        if not self.enabled:
+            yield
+            return
+
+        worker_profiles = []
+        token = _worker_profiles.set(worker_profiles)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _worker_profiles.reset(token)
+            profile_file = self._profile_path(question_num)
+            pstats.Stats(profiler, *worker_profiles).dump_stats(profile_file)
+            self.profile_files.append(profile_file)
+            self.logger.debug(f"Wrote profile to {profile_file}")
+
+    def _profile_path(self, question_num: int) -> str:
+        # a question can be profiled twice, e.g. after rejoining the websocket
+        name = f"{self.session}-question{question_num}"
+        path = os.path.join(self.profile_dir, f"{name}.prof")
+        attempt = 1
+        while os.path.exists(path):
+            attempt += 1
+            path = os.path.join(self.profile_dir, f"{name}-{attempt}.prof")
+        return path
+
+    def summary(self) -> str:
+        """
+        Returns the top hotspots over all questions profiled so far.
+        :return: pstats report, empty string if nothing was profiled
+        """
+        if not self.profile_files:
+            return ""
+
+        stream = io.StringIO()
+        stats = pstats.Stats(*self.profile_files, stream=stream)
+        stats.strip_dirs().sort_stats(self.sort_key).print_stats(self.num_hotspots)
+        return stream.getvalue()
+
+    def log_summary(self) -> None:
+        summary = self.summary()
+        if not summary:
+            return
+
+        self.logger.info(
+            f"Profiling hotspots over {len(self.profile_files)} questions:"
+        )
+        self.logger.info(summary)
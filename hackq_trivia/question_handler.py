@@ -1,23 +1,55 @@
+import asyncio
 import logging
 import re
 import string
 from time import time
-from typing import Dict, List, Match
+from typing import AsyncIterator, List, Match, Optional, Tuple
 
 import nltk
 import colorama
 
 from hackq_trivia.config import config
+from hackq_trivia.dedup import find_near_duplicates
+from hackq_trivia.loop_monitor import LoopLagMonitor
+from hackq_trivia.profiler import run_in_executor
+from hackq_trivia.recorder import SessionRecorder
+from hackq_trivia.scoring import (
+    IncrementalScorer,
+    ScoringContext,
+    ScoringMethod,
+    get_scoring_methods,
+)
 from hackq_trivia.searcher import Searcher
+from hackq_trivia.text_normalizer import TokenNormalizer
 
 
 class QuestionHandler:
-    def __init__(self):
+    def __init__(self, recorder: Optional[SessionRecorder] = None):
         self.simplified_output = config.getboolean("LIVE", "SimplifiedOutput")
         self.num_sites = config.getint("SEARCH", "NumSitesToSearch")
-
-        self.searcher = Searcher()
-        self.search_methods_to_use = [self._method1, self._method2]
+        self.extra_sites = config.getint("FETCH", "ExtraSitesToFetch")
+        self.match_variants = config.getboolean("SEARCH", "MatchWordVariants")
+        self.drop_near_duplicates = config.getboolean("FETCH", "DropNearDuplicates")
+        self.near_duplicate_threshold = config.getfloat(
+            "FETCH", "NearDuplicateThreshold"
+        )
+        self.incremental_scoring = config.getboolean("FETCH", "IncrementalScoring")
+        self.early_stop_margin = config.getint("FETCH", "EarlyStopMargin")
+        self.early_stop_min_pages = config.getint("FETCH", "EarlyStopMinPages")
+
+        self.searcher = Searcher(recorder)
+        self.search_methods_to_use = get_scoring_methods(
+            name.strip()
+            for name in config.get("SEARCH", "ScoringMethods").split(",")
+            if name.strip()
+        )
+        self.required_artifacts = list(
+            dict.fromkeys(
+                artifact
+                for method in self.search_methods_to_use
+                for artifact in method.requires
+            )
+        )
         self.logger = logging.getLogger(__name__)
 
         self.stopwords = set(nltk.corpus.stopwords.words("english")) - {"most", "least"}
@@ -27,13 +59,17 @@ class QuestionHandler:
         self.punctuation_to_space = str.maketrans(
             {key: " " for key in string.punctuation}
         )
+        self.normalizer = TokenNormalizer()
+        self.loop_monitor = LoopLagMonitor()
 
     async def close(self):
         await self.searcher.close()
+        await self.loop_monitor.stop()
 
     async def answer_question(self, question: str, original_choices: List[str]):
         self.logger.info("Searching...")
         start_time = time()
+        self.loop_monitor.start()
 
         question_lower = question.lower()
 
@@ -53,102 +89,229 @@ class QuestionHandler:
         ]
         choices: List[str] = sum(choice_groups, [])
 
-        # Step 1: Search web for results
-        keyword_start_time = time()
-        question_keywords = self.find_keywords(question)
-        if not self.simplified_output:
-            self.logger.info(f"Question keywords: {question_keywords}")
-        self.logger.debug(
-            f"Keywords took {round(time() - keyword_start_time, 2)} seconds"
+        # Stemming can merge different choices (e.g. News and New),
+        # count exact words for this question if it does
+        match_variants = self.match_variants and not self.variants_collide(
+            choice_groups
         )
+        if self.match_variants and not match_variants:
+            self.logger.debug("Choices share a stem, matching exact words")
+
+        # Step 1: Find keywords to search for
+        with self.loop_monitor.stage("keywords"):
+            keyword_start_time = time()
+            question_keywords = self.find_keywords(question)
+            if not self.simplified_output:
+                self.logger.info(f"Question keywords: {question_keywords}")
+            self.logger.debug(
+                f"Keywords took {round(time() - keyword_start_time, 2)} seconds"
+            )
 
-        search_start_time = time()
-        links = await self.searcher.get_search_links(
-            " ".join(question_keywords), self.num_sites
-        )
-        self.logger.debug(
-            f"Web search took {round(time() - search_start_time, 2)} seconds"
-        )
-        self.logger.debug(f"Found links: {links}")
+        # Step 2: Fetch links as each page of search results arrives, clean up text
+        # Answers are counted while pages download if the best answer occurs the most
+        scorer = None
+        if self.incremental_scoring and not reverse:
+            scorer = IncrementalScorer(
+                choice_groups,
+                lambda phrase: self.search_term(phrase, match_variants),
+                lambda text: self.prepare_text(
+                    text.translate(self.punctuation_to_none), match_variants
+                ),
+                self.early_stop_margin,
+                self.early_stop_min_pages,
+                self.near_duplicate_threshold if self.drop_near_duplicates else None,
+            )
 
-        # Step 2: Fetch links and clean up text
-        fetch_start_time = time()
-        link_texts = [
-            Searcher.html_to_visible_text(html).translate(self.punctuation_to_none)
-            for html in await self.searcher.fetch_multiple(links)
-        ]
-        self.logger.debug(
-            f"Fetching took {round(time() - fetch_start_time, 2)} seconds"
-        )
+        with self.loop_monitor.stage("search/fetch"):
+            fetch_start_time = time()
+            link_batches = self.searcher.stream_search_links(
+                " ".join(question_keywords), self.num_sites + self.extra_sites
+            )
+            if scorer is None:
+                pages = await self.searcher.fetch_fastest(
+                    link_batches, self.num_sites, visible_text=True
+                )
+            else:
+                pages = await self.fetch_and_score(link_batches, scorer)
+            self.logger.debug(f"Fetched links: {[url for url, _ in pages]}")
+            self.logger.debug(
+                f"Web search and fetching took {round(time() - fetch_start_time, 2)} seconds"
+            )
+
+        pages = [(url, text.translate(self.punctuation_to_none)) for url, text in pages]
+
+        for url, text in pages:
+            self.searcher.domain_tracker.record_usefulness(
+                url, self.keyword_coverage(text, question_keywords)
+            )
+
+        if self.drop_near_duplicates:
+            with self.loop_monitor.stage("dedup"):
+                pages = await self.drop_duplicate_pages(pages)
+
+        # the incremental scorer already prepared the text of the pages it counted
+        prepared_texts = scorer.prepared_texts() if scorer is not None else {}
 
         # Step 3: Find best answer for all search methods
-        post_process_start_time = time()
-        answers = []
-        for search_method in self.search_methods_to_use:
-            answer = await search_method(link_texts, choices, choice_groups, reverse)
-            answers.append(answer)
-            if answer:
-                self.logger.info(answer, extra={"pre": colorama.Fore.BLUE})
-            else:
-                self.logger.info("Tie", extra={"pre": colorama.Fore.BLUE})
+        with self.loop_monitor.stage("score"):
+            post_process_start_time = time()
+            # prepare texts, build shared artifacts and run methods off the event loop
+            # so the websocket connection stays responsive. The threads share the GIL,
+            # so methods do not run in parallel
+            scan_texts = await run_in_executor(
+                lambda: [
+                    prepared_texts.get(url) or self.prepare_text(text, match_variants)
+                    for url, text in pages
+                ],
+            )
+            context = ScoringContext(
+                scan_texts, choices, choice_groups, reverse, self, match_variants
+            )
+            await run_in_executor(context.build, self.required_artifacts)
+
+            async def run_method(method: ScoringMethod) -> str:
+                answer = await run_in_executor(method, context)
+                self.logger.info(
+                    f"{method.name}: {answer or 'Tie'}",
+                    extra={"pre": colorama.Fore.BLUE},
+                )
+                return answer
+
+            answers = await asyncio.gather(
+                *(run_method(method) for method in self.search_methods_to_use)
+            )
 
         self.logger.debug(
             f"Post-processing took {round(time() - post_process_start_time, 2)} seconds"
         )
 
         self.logger.info(f"Search took {round(time() - start_time, 2)} seconds")
+        self.loop_monitor.log_stalls()
         return answers
 
-    async def _method1(
+    async def fetch_and_score(
         self,
-        texts: List[str],
-        answers: List[str],
-        answer_groups: List[List[str]],
-        reverse: bool,
-    ) -> str:
+        link_batches: AsyncIterator[List[Tuple[int, str]]],
+        scorer: IncrementalScorer,
+    ) -> List[Tuple[str, str]]:
         """
-        Returns the answer with the best number of exact occurrences in texts.
-        :param texts: List of webpages (strings) to analyze
-        :param answers: List of answers
-        :param answer_groups: Groupings of different ways of writing the answer
-        :param reverse: True if the best answer occurs the least, False otherwise
-        :return: Answer that occurs the most/least in the texts, empty string if there is a tie
+        Fetches pages like Searcher.fetch_fastest while counting answers in them.
+        Stops fetching as soon as the scorer decides.
+        :param link_batches: Async iterator of ranked URL batches (see Searcher.stream_search_links)
+        :param scorer: Scorer to feed the pages' text to
+        :return: List of (url, visible text) tuples, partially downloaded if decided early
         """
-        self.logger.info("Running method 1")
 
-        counts = {answer: 0 for answer in answers}
-        for text in texts:
-            for answer in answers:
-                counts[answer] += text.count(f" {answer.lower()} ")
+        async def fetch_and_count(url: str) -> str:
+            page = scorer.add_page(url)
+            text = await self.searcher.stream_visible_text(url, page.feed)
+            if text:
+                await page.finish()
+            else:
+                scorer.discard_page(url)
+            return text
+
+        ranks = {}
+        pages = await self.searcher.fetch_fastest(
+            link_batches,
+            self.num_sites,
+            fetch_func=fetch_and_count,
+            stop=scorer.decided,
+            ranks=ranks,
+        )
+        if not scorer.decided.is_set():
+            return pages
 
-        self.logger.info(counts)
-        return self.__get_best_answer(counts, answer_groups, reverse)
+        if not self.simplified_output:
+            self.logger.info(
+                f"Stopped fetching early, {scorer.answer} leads with {scorer.totals()}"
+            )
+        # keep NumSitesToSearch pages like fetch_fastest, partial pages included
+        return scorer.page_texts(self.num_sites, ranks)
 
-    async def _method2(
-        self,
-        texts: List[str],
-        answers: List[str],
-        answer_groups: List[List[str]],
-        reverse: bool,
-    ) -> str:
+    async def drop_duplicate_pages(
+        self, pages: List[Tuple[str, str]]
+    ) -> List[Tuple[str, str]]:
+        """
+        Removes pages whose text is a near-duplicate of an earlier page's text.
+        :param pages: List of (url, text) tuples in order of preference
+        :return: List of (url, text) tuples without near-duplicates
+        """
+        duplicates = await run_in_executor(
+            find_near_duplicates,
+            [text for _, text in pages],
+            self.near_duplicate_threshold,
+        )
+        if duplicates and not self.simplified_output:
+            self.logger.info(
+                f"Dropped {len(duplicates)} near-duplicate page(s) of {len(pages)}"
+            )
+        duplicates = set(duplicates)
+        return [page for i, page in enumerate(pages) if i not in duplicates]
+
+    def prepare_text(self, text: str, match_variants: Optional[bool] = None) -> str:
+        """
+        Converts webpage text to the form scoring methods scan.
+        If MatchWordVariants is enabled, words are replaced by their stems once
+        here so variants of answers match without scanning the text again.
+        :param text: Lowercase webpage text without punctuation
+        :param match_variants: Overrides MatchWordVariants if not None
+        :return: Text to pass to scoring methods
+        """
+        if match_variants is None:
+            match_variants = self.match_variants
+        if match_variants:
+            return self.normalizer.normalize(text)
+        return text
+
+    def search_term(self, phrase: str, match_variants: Optional[bool] = None) -> str:
         """
-        Returns the answers with the best number of occurrences of the answer's keywords in texts.
-        :param texts: List of webpages (strings) to analyze
-        :param answers: List of answers
-        :param answer_groups: Groupings of different ways of writing the answer
-        :param reverse: True if the best answer occurs the least, False otherwise
-        :return: Answer that occurs the most/least in the texts, empty string if there is a tie
+        Converts an answer or keyword to the padded term counted in prepared texts.
+        :param phrase: Answer or keyword
+        :param match_variants: Overrides MatchWordVariants if not None
+        :return: Term including surrounding spaces
         """
-        self.logger.info("Running method 2")
+        if match_variants is None:
+            match_variants = self.match_variants
+        if match_variants:
+            return self.normalizer.normalize(phrase.translate(self.punctuation_to_none))
+        return f" {phrase.lower()} "
 
-        counts = {answer: 0 for answer in answers}
-        for text in texts:
-            for answer in answers:
-                for keyword in self.find_keywords(answer, sentences=False):
-                    counts[answer] += text.count(f" {keyword.lower()} ")
+    def variants_collide(self, choice_groups: List[List[str]]) -> bool:
+        """
+        Returns True if stemming maps two different choices to the same term.
+        :param choice_groups: Groupings of different ways of writing each choice
+        """
+        exact_terms = [
+            {self.search_term(choice, False) for choice in group}
+            for group in choice_groups
+        ]
+        stem_terms = [
+            {self.search_term(choice, True) for choice in group}
+            for group in choice_groups
+        ]
+        return any(
+            stem_terms[i] & stem_terms[j] and not exact_terms[i] & exact_terms[j]
+            for i in range(len(choice_groups))
+            for j in range(i + 1, len(choice_groups))
+        )
 
-        self.logger.info(counts)
-        return self.__get_best_answer(counts, answer_groups, reverse)
+    def keyword_coverage(self, text: str, keywords: List[str]) -> float:
+        """
+        Returns the fraction of keywords that occur in text.
+        :param text: Lowercase webpage text without punctuation
+        :param keywords: Keywords of the question
+        :return: Value between 0 and 1, 0 if there are no keywords
+        """
+        if not keywords:
+            return 0.0
+
+        padded_text = f" {text} "
+        found = sum(
+            f" {keyword.translate(self.punctuation_to_none).lower()} " in padded_text
+            for keyword in keywords
+        )
+        return found / len(keywords)
 
     def find_keywords(self, text: str, sentences: bool = True) -> List[str]:
         """
@@ -200,34 +363,5 @@ class QuestionHandler:
 
         # Return keywords, sorted by index of occurrence
         keywords = list(sorted(keyword_indices, key=keyword_indices.get))
-        # TODO: handle plural and singular, see test_question_handler.py
+        # plural and singular forms are matched by search_term, see MatchWordVariants
         return keywords
-
-    @staticmethod
-    def __get_best_answer(
-        all_scores: Dict, choice_groups: List[List[str]], reverse: bool = False
-    ):
-        """
-        Returns best answer based on scores for each choice and groups of choices.
-        :param all_scores: Dict mapping choices to scores
-        :param choice_groups: List of lists (groups) of choices
-        :param reverse: If True, return lowest scoring choice group, otherwise return highest
-        :return: String (first entry in group) of the group with the highest/lowest total score
-        """
-        # Add scores of the same answer together due to two ways of removing punctuation
-        scores = {
-            choices[0]: sum(all_scores[choice] for choice in choices)
-            for choices in choice_groups
-        }
-
-        best_value = min(scores.values()) if reverse else max(scores.values())
-
-        # Make sure the scores are not all 0 and the best value doesn't occur more than once
-        if (
-            not all(c == 0 for c in scores.values())
-            and list(scores.values()).count(best_value) == 1
-        ):
-            return (
-                min(scores, key=scores.get) if reverse else max(scores, key=scores.get)
-            )
-        return ""
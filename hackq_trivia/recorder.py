@@ -0,0 +1,148 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import zlib
+from time import monotonic, time
+from typing import Dict, Iterator, List, Optional
+
+from hackq_trivia.config import config
+
+
+class SessionRecorder:
+    """
+    Appends websocket frames and search/fetch responses to gzipped JSONL files.
+    Each line is a JSON object with a monotonic timestamp "t" and a "kind".
+    Files are numbered by replacing {} in the file name and a new file is
+    started once the current one exceeds the maximum size.
+    Every time a file is opened, a "start" record maps the monotonic clock
+    to wall clock time.
+    """
+
+    FLUSH_INTERVAL = 1.0
+    # records are written on the event loop, level 9 takes ~30 ms per large page
+    COMPRESS_LEVEL = 1
+
+    def __init__(self, path_pattern: str, max_file_size: int):
+        """
+        :param path_pattern: File name containing a format placeholder ({})
+        :param max_file_size: Size in bytes after which a new file is started
+        """
+        if path_pattern.format(0) == path_pattern:
+            raise ValueError(f"Recording file {path_pattern} must contain {{}}")
+
+        self.path_pattern = path_pattern
+        self.max_file_size = max_file_size
+        self.logger = logging.getLogger(__name__)
+
+        self._file_num = 0
+        self._raw_file = None
+        self._gzip_file: Optional[gzip.GzipFile] = None
+        self._last_flush = 0.0
+
+    @classmethod
+    def from_config(cls) -> "SessionRecorder":
+        path_pattern = config.get("RECORDING", "File")
+        if not os.path.isabs(path_pattern):
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            path_pattern = os.path.join(script_dir, path_pattern)
+
+        max_file_size = int(config.getfloat("RECORDING", "MaxFileSizeMB") * 1024**2)
+        return cls(path_pattern, max_file_size)
+
+    def _open_next(self) -> None:
+        if self._file_num == 0:
+            # continue appending to the newest existing file
+            existing = session_files(self.path_pattern)
+            self._file_num = (
+                file_number(self.path_pattern, existing[-1]) if existing else 1
+            )
+        else:
+            self._file_num += 1
+
+        path = self.path_pattern.format(self._file_num)
+        while os.path.exists(path) and os.path.getsize(path) >= self.max_file_size:
+            self._file_num += 1
+            path = self.path_pattern.format(self._file_num)
+
+        self._raw_file = open(path, "ab")
+        # appending to a gzip file adds a new member, readers see one stream
+        self._gzip_file = gzip.GzipFile(
+            fileobj=self._raw_file, mode="ab", compresslevel=self.COMPRESS_LEVEL
+        )
+        self.logger.debug(f"Recording session to {path}")
+        self._write({"t": monotonic(), "kind": "start", "wall": time()})
+
+    def _write(self, record: Dict) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._gzip_file.write(line.encode("utf-8"))
+
+    def record(self, kind: str, **fields) -> None:
+        """
+        Appends one record, rotating to a new file if the current one is full.
+        :param kind: Type of record, e.g. ws, search or fetch
+        :param fields: JSON serializable fields of the record
+        """
+        if self._gzip_file is None:
+            self._open_next()
+        elif self._raw_file.tell() >= self.max_file_size:
+            self.close()
+            self._open_next()
+
+        now = monotonic()
+        self._write({"t": now, "kind": kind, **fields})
+
+        if now - self._last_flush >= self.FLUSH_INTERVAL:
+            self._gzip_file.flush()
+            self._last_flush = now
+
+    def close(self) -> None:
+        if self._gzip_file is None:
+            return
+
+        self._gzip_file.close()
+        self._raw_file.close()
+        self._gzip_file = None
+        self._raw_file = None
+
+
+def file_number(path_pattern: str, path: str) -> int:
+    prefix, suffix = path_pattern.split("{}", 1)
+    return int(path[len(prefix) : len(path) - len(suffix)])
+
+
+def session_files(path_pattern: str) -> List[str]:
+    """
+    Returns all files recorded with path_pattern, in recording order.
+    """
+    prefix, suffix = path_pattern.split("{}", 1)
+    file_re = re.compile(re.escape(prefix) + r"\d+" + re.escape(suffix) + "$")
+    paths = [
+        path
+        for path in glob.glob(glob.escape(prefix) + "*" + glob.escape(suffix))
+        if file_re.match(path)
+    ]
+    return sorted(paths, key=lambda path: file_number(path_pattern, path))
+
+
+def read_session(path: str) -> Iterator[Dict]:
+    """
+    Streams records from a recorded file, or from all files of a
+    recording if path contains a format placeholder ({}).
+    A truncated file (e.g. after a crash) is read up to the last complete record.
+    :param path: Recorded file or file name pattern
+    :return: Iterator over records in the order they were written
+    """
+    paths = session_files(path) if path.format(0) != path else [path]
+
+    for file_path in paths:
+        with gzip.open(file_path, "rt", encoding="utf-8") as session_file:
+            try:
+                for line in session_file:
+                    if not line.endswith("\n"):
+                        break
+                    yield json.loads(line)
+            except (EOFError, zlib.error):
+                logging.getLogger(__name__).warning(f"{file_path} is truncated")
@@ -0,0 +1,465 @@
+import asyncio
+import logging
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from hackq_trivia.dedup import fingerprint, similarity
+from hackq_trivia.profiler import run_in_executor
+
+
+class InvalidScoringMethodError(Exception):
+    """Raise when a scoring method specified in config is not registered."""
+
+
+class ScoringContext:
+    """
+    Inputs shared by all scoring methods for one question.
+    Artifacts (see ARTIFACT_BUILDERS) are built at most once per question
+    and then shared by every method that requires them.
+    """
+
+    def __init__(
+        self,
+        texts: List[str],
+        answers: List[str],
+        answer_groups: List[List[str]],
+        reverse: bool,
+        question_handler,
+        match_variants: Optional[bool] = None,
+    ):
+        """
+        :param texts: List of webpages (strings) to analyze, see QuestionHandler.prepare_text
+        :param answers: List of answers
+        :param answer_groups: Groupings of different ways of writing the answer
+        :param reverse: True if the best answer occurs the least, False otherwise
+        :param question_handler: QuestionHandler used to convert answers to search terms
+        :param match_variants: Whether texts were prepared with stemming, None for the config default
+        """
+        self.texts = texts
+        self.answers = answers
+        self.answer_groups = answer_groups
+        self.reverse = reverse
+        self.question_handler = question_handler
+        self.match_variants = match_variants
+        self.artifacts: Dict[str, object] = {}
+
+    def build(self, names: Iterable[str]) -> None:
+        for name in names:
+            if name not in self.artifacts:
+                self.artifacts[name] = ARTIFACT_BUILDERS[name](self)
+
+    def __getitem__(self, name: str):
+        if name not in self.artifacts:
+            self.build([name])
+        return self.artifacts[name]
+
+    def search_term(self, phrase: str) -> str:
+        """
+        Converts an answer or keyword to the term counted in the texts.
+        """
+        return self.question_handler.search_term(phrase, self.match_variants)
+
+    def count_term(self, term: str) -> int:
+        """
+        Returns the number of occurrences of a search term over all texts.
+        Occurrences may share the spaces around them, so repeated words like
+        " uno uno uno " count the same whether the term is looked up in the
+        token counts (single words, if built) or searched for in the text.
+        :param term: Term from QuestionHandler.search_term
+        """
+        tokens = term.split()
+        if len(tokens) == 1 and "token_counts" in self.artifacts:
+            return self.artifacts["token_counts"][tokens[0]]
+
+        # words are separated by single spaces in the combined text
+        count, _ = count_occurrences(self["combined_text"], f" {' '.join(tokens)} ")
+        return count
+
+
+def count_occurrences(text: str, term: str, start: int = 0) -> Tuple[int, int]:
+    """
+    Counts the occurrences of a term in text, letting occurrences share
+    one character (the space between two words).
+    :param text: Text to search
+    :param term: Term to count
+    :param start: Index to start searching at
+    :return: Tuple of (number of occurrences, index to resume searching at
+    if text is continued)
+    """
+    step = max(len(term) - 1, 1)
+    count = 0
+    index = text.find(term, start)
+    while index != -1:
+        count += 1
+        start = index + step
+        index = text.find(term, start)
+    return count, start
+
+
+class ScoringMethod:
+    def __init__(
+        self, name: str, func: Callable[[ScoringContext], str], requires: List[str]
+    ):
+        self.name = name
+        self.func = func
+        self.requires = requires
+
+    def __call__(self, context: ScoringContext) -> str:
+        return self.func(context)
+
+
+ARTIFACT_BUILDERS: Dict[str, Callable[[ScoringContext], object]] = {}
+SCORING_METHODS: Dict[str, ScoringMethod] = {}
+
+
+def artifact(name: str):
+    """
+    Registers a function building a shared artifact from a ScoringContext.
+    """
+
+    def decorator(func: Callable[[ScoringContext], object]):
+        ARTIFACT_BUILDERS[name] = func
+        return func
+
+    return decorator
+
+
+def scoring_method(name: str, requires: Iterable[str] = ()):
+    """
+    Registers a scoring method that can be selected with ScoringMethods in the config.
+    :param name: Name used in the config
+    :param requires: Names of the artifacts the method uses
+    """
+
+    def decorator(func: Callable[[ScoringContext], str]):
+        SCORING_METHODS[name] = ScoringMethod(name, func, list(requires))
+        return func
+
+    return decorator
+
+
+def get_scoring_methods(names: Iterable[str]) -> List[ScoringMethod]:
+    methods = []
+    for name in names:
+        if name not in SCORING_METHODS:
+            raise InvalidScoringMethodError(
+                f"Scoring method {name} was not recognized. "
+                f'Available methods: {", ".join(SCORING_METHODS)}'
+            )
+        methods.append(SCORING_METHODS[name])
+    return methods
+
+
+@artifact("combined_text")
+def build_combined_text(context: ScoringContext) -> str:
+    # single spaces between words so multi-word terms match across line breaks,
+    # terms contain no newlines, so they cannot match across two texts
+    return "\n".join(f" {' '.join(text.split())} " for text in context.texts)
+
+
+@artifact("token_counts")
+def build_token_counts(context: ScoringContext) -> Counter:
+    return Counter(context["combined_text"].split())
+
+
+@scoring_method("method1", requires=["combined_text", "token_counts"])
+def method1(context: ScoringContext) -> str:
+    """
+    Returns the answer with the best number of exact occurrences in texts.
+    :return: Answer that occurs the most/least in the texts, empty string if there is a tie
+    """
+    counts = {
+        answer: context.count_term(context.search_term(answer))
+        for answer in context.answers
+    }
+
+    logging.getLogger(__name__).info(f"method1: {counts}")
+    return get_best_answer(counts, context.answer_groups, context.reverse)
+
+
+@scoring_method("method2", requires=["combined_text", "token_counts"])
+def method2(context: ScoringContext) -> str:
+    """
+    Returns the answers with the best number of occurrences of the answer's keywords in texts.
+    :return: Answer that occurs the most/least in the texts, empty string if there is a tie
+    """
+    question_handler = context.question_handler
+    counts = {
+        answer: sum(
+            context.count_term(context.search_term(keyword))
+            for keyword in question_handler.find_keywords(answer, sentences=False)
+        )
+        for answer in context.answers
+    }
+
+    logging.getLogger(__name__).info(f"method2: {counts}")
+    return get_best_answer(counts, context.answer_groups, context.reverse)
+
+
+def get_best_answer(
+    all_scores: Dict, choice_groups: List[List[str]], reverse: bool = False
+) -> str:
+    """
+    Returns best answer based on scores for each choice and groups of choices.
+    :param all_scores: Dict mapping choices to scores
+    :param choice_groups: List of lists (groups) of choices
+    :param reverse: If True, return lowest scoring choice group, otherwise return highest
+    :return: String (first entry in group) of the group with the highest/lowest total score
+    """
+    # Add scores of the same answer together due to two ways of removing punctuation
+    scores = {
+        choices[0]: sum(all_scores[choice] for choice in choices)
+        for choices in choice_groups
+    }
+
+    best_value = min(scores.values()) if reverse else max(scores.values())
+
+    # Make sure the scores are not all 0 and the best value doesn't occur more than once
+    if (
+        not all(c == 0 for c in scores.values())
+        and list(scores.values()).count(best_value) == 1
+    ):
+        return min(scores, key=scores.get) if reverse else max(scores, key=scores.get)
+    return ""
+
+
+class PageCounter:
+    """
+    Running per-answer counts of one page whose text arrives in pieces.
+    """
+
+    # the last whitespace character of a piece, words after it may continue
+    LAST_SPACE_RE = re.compile(r"\s(?=\S*$)")
+
+    def __init__(self, scorer: "IncrementalScorer"):
+        self.scorer = scorer
+        self.counts = dict.fromkeys(scorer.terms, 0)
+        self.pieces: List[str] = []
+        self.finished = False
+        # set once the page is finished if the scorer looks for near-duplicates
+        self.sketch: Optional[List[int]] = None
+        self.duplicate = False
+        self._prepared_pieces: List[str] = []
+        self._carry = ""
+        self._tail = ""
+        # index in the tail to resume searching for each answer at
+        self._resume = dict.fromkeys(scorer.terms, 0)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+    @property
+    def prepared_text(self) -> str:
+        """
+        The page's text as returned by the scorer's prepare_text, padded with
+        spaces. Only includes whole words if the page is not finished.
+        """
+        return "".join(self._prepared_pieces) + " "
+
+    async def feed(self, text: str) -> None:
+        """
+        Counts the answers in the next piece of the page's visible text.
+        A word cut off at the end of the piece is counted with the next piece.
+        :param text: Lowercase visible text (see Searcher.stream_visible_text)
+        """
+        self.pieces.append(text)
+        text = self._carry + text
+        match = self.LAST_SPACE_RE.search(text)
+        if match is None:
+            self._carry = text
+            return
+
+        self._carry = text[match.start() :]
+        await self._count(text[: match.start()])
+        self.scorer.update()
+
+    async def finish(self) -> None:
+        """
+        Counts the rest of the page once it has been downloaded.
+        """
+        carry, self._carry = self._carry, ""
+        await self._count(carry, final=True)
+        self.finished = True
+        await self.scorer.check_duplicate(self)
+        self.scorer.update()
+
+    async def _count(self, text: str, final: bool = False) -> None:
+        # stemming is too slow to run on the event loop, see prepare_text
+        prepared = await run_in_executor(self.scorer.prepare_text, text)
+        tokens = prepared.split()
+        segment = " " + " ".join(tokens) if tokens else ""
+        self._prepared_pieces.append(segment)
+        if final:
+            segment += " "
+
+        # the tail of the previous segments holds matches that start before
+        # this segment, searching resumes where it stopped so the counts
+        # are the same as counting the whole page at once
+        window = self._tail + segment
+        tail = window[-self.scorer.tail_size :] if self.scorer.tail_size else ""
+        shift = len(window) - len(tail)
+        for answer, term in self.scorer.terms.items():
+            count, resume = count_occurrences(window, term, self._resume[answer])
+            self.counts[answer] += count
+            self._resume[answer] = max(resume - shift, 0)
+        self._tail = tail
+
+
+class IncrementalScorer:
+    """
+    Counts the answers of a question in pages while they download, like method1,
+    and decides early once one answer leads the others by a wide margin
+    on several pages. Only makes sense if the best answer occurs the most.
+    If near-duplicates are looked for, only finished pages that are not
+    near-duplicates of each other count as pages the leader leads on,
+    so mirrors of one article cannot decide alone.
+    """
+
+    def __init__(
+        self,
+        answer_groups: List[List[str]],
+        search_term: Callable[[str], str],
+        prepare_text: Callable[[str], str],
+        margin: int,
+        min_pages: int,
+        duplicate_threshold: Optional[float] = None,
+    ):
+        """
+        :param answer_groups: Groupings of different ways of writing the answer
+        :param search_term: Converts an answer to the term counted in prepared text
+        :param prepare_text: Converts visible text to the form terms are counted in
+        :param margin: Minimum lead in total count over the runner-up to decide
+        :param min_pages: Minimum number of pages the leader must lead on to decide
+        :param duplicate_threshold: Minimum similarity of near-duplicate pages
+        (see dedup.find_near_duplicates), None to count every page
+        """
+        self.answer_groups = answer_groups
+        self.prepare_text = prepare_text
+        self.margin = margin
+        self.min_pages = min_pages
+        self.duplicate_threshold = duplicate_threshold
+
+        # single spaced like the terms searched by ScoringContext.count_term
+        self.terms = {
+            answer: f" {' '.join(search_term(answer).split())} "
+            for group in answer_groups
+            for answer in group
+        }
+        self.tail_size = max(len(term) for term in self.terms.values()) - 1
+        self.pages: Dict[str, PageCounter] = {}
+
+        self.answer = ""
+        self.decided = asyncio.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def add_page(self, url: str) -> PageCounter:
+        page = PageCounter(self)
+        self.pages[url] = page
+        return page
+
+    def discard_page(self, url: str) -> None:
+        """
+        Stops counting a page, e.g. because its download failed.
+        """
+        self.pages.pop(url, None)
+
+    async def check_duplicate(self, page: PageCounter) -> None:
+        """
+        Marks a finished page as a duplicate if it is a near-duplicate of
+        a page that finished before it.
+        """
+        if self.duplicate_threshold is None:
+            return
+
+        page.sketch = await run_in_executor(fingerprint, page.prepared_text)
+        page.duplicate = any(
+            similarity(page.sketch, other.sketch) >= self.duplicate_threshold
+            for other in self.pages.values()
+            if other is not page and other.sketch is not None and not other.duplicate
+        )
+
+    def page_texts(
+        self, num_to_keep: int, ranks: Optional[Dict[str, int]] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Returns the text of at most num_to_keep pages, preferring finished pages
+        that are not near-duplicates.
+        :param num_to_keep: Maximum number of pages to return
+        :param ranks: Search rank of each URL, pages are ordered by it if given
+        :return: List of (url, visible text so far) of pages with text, in rank order
+        (or the order they were added)
+        """
+        order = {url: i for i, url in enumerate(self.pages)}
+        if ranks is not None:
+            order = {url: ranks.get(url, len(order) + i) for url, i in order.items()}
+
+        urls = [url for url, page in self.pages.items() if page.pieces]
+        kept = sorted(
+            urls,
+            key=lambda url: (
+                self.pages[url].duplicate,
+                not self.pages[url].finished,
+                order[url],
+            ),
+        )
+        kept = sorted(kept[:num_to_keep], key=order.get)
+        return [(url, self.pages[url].text) for url in kept]
+
+    def prepared_texts(self) -> Dict[str, str]:
+        """
+        :return: Dict mapping URLs to the prepared text of the page (see PageCounter.prepared_text)
+        """
+        return {url: page.prepared_text for url, page in self.pages.items()}
+
+    def group_scores(self, counts: Dict[str, int]) -> Dict[str, int]:
+        # same grouping as get_best_answer
+        return {
+            group[0]: sum(counts[answer] for answer in group)
+            for group in self.answer_groups
+        }
+
+    def totals(self) -> Dict[str, int]:
+        counts = Counter()
+        for page in self.pages.values():
+            if not page.duplicate:
+                counts.update(page.counts)
+        return self.group_scores(counts)
+
+    def update(self) -> None:
+        """
+        Sets decided and answer if the leading answer is decisive across pages.
+        """
+        if self.decided.is_set():
+            return
+
+        totals = self.totals()
+        if len(totals) < 2:
+            return
+
+        leader, runner_up = sorted(totals, key=totals.get, reverse=True)[:2]
+        if totals[leader] - totals[runner_up] < self.margin:
+            return
+
+        pages_led = 0
+        for page in self.pages.values():
+            if page.duplicate or (
+                self.duplicate_threshold is not None and not page.finished
+            ):
+                continue
+            scores = self.group_scores(page.counts)
+            if all(
+                scores[leader] > score
+                for group, score in scores.items()
+                if group != leader
+            ):
+                pages_led += 1
+
+        if pages_led >= self.min_pages:
+            self.answer = leader
+            self.decided.set()
+            self.logger.debug(
+                f"Early decision: {totals} after {len(self.pages)} pages, "
+                f"{leader} leads on {pages_led}"
+            )
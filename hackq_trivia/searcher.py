@@ -1,25 +1,346 @@
 import asyncio
+import codecs
 import logging
+import os
+import re
 from html import unescape
-from typing import Iterable, List
+from html.parser import HTMLParser
+from time import perf_counter
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import aiohttp
 import bs4
 from anyascii import anyascii
 
 from hackq_trivia.config import config
+from hackq_trivia.domain_stats import DomainTracker
+from hackq_trivia.recorder import SessionRecorder
+
+# aiohttp 3.7 decodes br responses itself with the brotlipy API
+# (Decompressor.decompress), Google's Brotli package only has process()
+try:
+    import brotli
+
+    if not hasattr(brotli.Decompressor(), "decompress"):
+        brotli = None
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 class InvalidSearchServiceError(Exception):
     """Raise when search service specified in config is not recognized."""
 
 
+T = TypeVar("T")
+
+ACCEPT_ENCODING = ", ".join(
+    ["gzip", "deflate"] + (["br"] if brotli else []) + (["zstd"] if zstandard else [])
+)
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+META_CHARSET_RE = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_:.-]+)""", re.IGNORECASE
+)
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def sniff_charset(body: bytes, sniff_bytes: int = 2048) -> Optional[str]:
+    """
+    Finds the charset of an HTML document from a byte order mark or
+    a <meta> tag in its first bytes.
+    :param body: Raw HTML document
+    :param sniff_bytes: Number of bytes to search for a <meta> charset
+    :return: Name of the charset, None if not declared
+    """
+    for bom, charset in BOMS:
+        if body.startswith(bom):
+            return charset
+
+    match = META_CHARSET_RE.search(body, 0, sniff_bytes)
+    return match[1].decode("ascii") if match else None
+
+
+def decode_html(body: bytes, declared_charset: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Decodes an HTML document without guessing the charset from the whole body.
+    Uses the declared charset, then the document's own declaration, then UTF-8.
+    Undecodable bytes are replaced.
+    :param body: Raw HTML document
+    :param declared_charset: Charset from the Content-Type header, if any
+    :return: Tuple of decoded text and the charset used
+    """
+    charset = declared_charset or sniff_charset(body) or "utf-8"
+    try:
+        return body.decode(charset, errors="replace"), charset
+    except LookupError:
+        return body.decode("utf-8", errors="replace"), "utf-8"
+
+
+class StreamingHtmlDecoder:
+    """
+    Incremental counterpart of decode_html for bodies read in chunks.
+    The first sniff_bytes bytes are buffered to choose the charset.
+    """
+
+    def __init__(
+        self,
+        declared_charset: Optional[str] = None,
+        content_encoding: str = "",
+        sniff_bytes: int = 2048,
+    ):
+        """
+        :param declared_charset: Charset from the Content-Type header, if any
+        :param content_encoding: Lowercase Content-Encoding header of the response
+        :param sniff_bytes: Number of bytes to search for a <meta> charset
+        """
+        self.declared_charset = declared_charset
+        self.content_encoding = content_encoding
+        self.sniff_bytes = sniff_bytes
+        self.charset: Optional[str] = None
+        self.bytes_read = 0
+        self.bytes_decoded = 0
+        self.zstd_decoded = False
+
+        self._pending = b""
+        self._decompressor = None
+        self._decoder = None
+
+    def decode(self, chunk: bytes, final: bool = False) -> str:
+        """
+        :param chunk: Next bytes of the body
+        :param final: True for the last chunk
+        :return: Text decoded so far that was not returned before
+        """
+        self.bytes_read += len(chunk)
+        if self._decoder is None:
+            self._pending += chunk
+            if len(self._pending) < self.sniff_bytes and not final:
+                return ""
+            chunk, self._pending = self._pending, b""
+
+            if self.content_encoding == "zstd" and chunk.startswith(ZSTD_MAGIC):
+                # older versions of aiohttp pass zstd bodies through undecoded
+                self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+                self.zstd_decoded = True
+
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+
+        if self._decoder is None:
+            self.charset = self.declared_charset or sniff_charset(chunk) or "utf-8"
+            try:
+                self._decoder = codecs.getincrementaldecoder(self.charset)("replace")
+            except LookupError:
+                self.charset = "utf-8"
+                self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        self.bytes_decoded += len(chunk)
+        return self._decoder.decode(chunk, final)
+
+
+class VisibleTextParser(HTMLParser):
+    """
+    Incremental counterpart of Searcher.html_to_visible_text.
+    Extracts the visible text of a document that is fed in pieces.
+    """
+
+    HIDDEN_TAGS = {"style", "script", "head", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._hidden_depth = 0
+        self._pieces: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.HIDDEN_TAGS:
+            self._hidden_depth += 1
+        elif tag == "body":
+            # an unclosed <head> must not hide the whole page
+            self._hidden_depth = 0
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in self.HIDDEN_TAGS and self._hidden_depth:
+            self._hidden_depth -= 1
+
+    def handle_data(self, data):
+        if not self._hidden_depth:
+            self._pieces.append(data)
+
+    def feed_text(self, html: str) -> str:
+        """
+        :param html: Next piece of the document
+        :return: Lowercase visible text completed by this piece
+        """
+        self.feed(html)
+        return self._take_text()
+
+    def close_text(self) -> str:
+        """
+        :return: Lowercase visible text left at the end of the document
+        """
+        self.close()
+        return self._take_text()
+
+    def _take_text(self) -> str:
+        text = anyascii("".join(self._pieces)).lower()
+        self._pieces = []
+        return text
+
+
+def page_ranges(num_results: int, page_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits a number of results into pages.
+    :param num_results: Total number of results
+    :param page_size: Maximum number of results per page
+    :return: List of (offset, count) tuples, offsets starting at 0
+    """
+    return [
+        (offset, min(page_size, num_results - offset))
+        for offset in range(0, num_results, page_size)
+    ]
+
+
+def merge_links(pages: Iterable[List[str]]) -> List[str]:
+    """
+    Concatenates pages of links in rank order, dropping duplicates.
+    """
+    return list(dict.fromkeys(link for page in pages for link in page))
+
+
+async def single_batch(batch: T) -> AsyncIterator[T]:
+    yield batch
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight task.
+    The task is only cancelled once every caller waiting on it was cancelled.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[Hashable, Tuple[asyncio.Future, List[int]]] = {}
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Awaits func(), or the result of an in-flight call with the same key.
+        :param key: Identifies calls that return the same result
+        :param func: Called to start the work if no call with key is in flight
+        :return: Result of the shared call
+        """
+        return await self.wait(key, self.start(key, func))
+
+    def start(
+        self, key: Hashable, func: Callable[[], Awaitable[T]]
+    ) -> "asyncio.Future[T]":
+        """
+        Returns the in-flight task for key, calling func() to start it if there
+        is none. Every call must be followed by awaiting wait(key, task).
+        """
+        if key in self.in_flight:
+            task, waiters = self.in_flight[key]
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func())
+            waiters = [0]
+            self.in_flight[key] = (task, waiters)
+            task.add_done_callback(lambda _: self._forget(key, task))
+
+        waiters[0] += 1
+        return task
+
+    async def wait(self, key: Hashable, task: "asyncio.Future[T]") -> T:
+        """
+        Awaits a task returned by start, cancelling it if this was its last waiter.
+        """
+        try:
+            return await asyncio.shield(task)
+        finally:
+            # a task that is not done is still in flight
+            if not task.done():
+                waiters = self.in_flight[key][1]
+                waiters[0] -= 1
+                if waiters[0] == 0:
+                    self._forget(key, task)
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        # a cancelled task may still be in flight while a new one is started
+        if key in self.in_flight and self.in_flight[key][0] is task:
+            del self.in_flight[key]
+
+
+class TextStream:
+    """
+    Pieces of text produced by one task, replayed to every reader from the start.
+    """
+
+    def __init__(self):
+        self.pieces: List[str] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def add(self, piece: str) -> None:
+        self.pieces.append(piece)
+        self._changed.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._changed.set()
+
+    async def replay(self, on_piece: Callable[[str], Awaitable[None]]) -> None:
+        """
+        Awaits on_piece with every piece, including pieces added before
+        the call, until the stream is closed.
+        """
+        num_read = 0
+        while True:
+            while num_read < len(self.pieces):
+                num_read += 1
+                await on_piece(self.pieces[num_read - 1])
+            if self.closed:
+                return
+
+            self._changed.clear()
+            await self._changed.wait()
+
+
 class Searcher:
     HEADERS = {"User-Agent": "HQbot"}
     BING_ENDPOINT = "https://api.bing.microsoft.com/v7.0/search"
     GOOGLE_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
+    # Custom Search returns at most 10 results per request and 100 in total
+    GOOGLE_PAGE_SIZE = 10
+    GOOGLE_MAX_RESULTS = 100
+    BING_PAGE_SIZE = 50
+    BING_MAX_RESULTS = 1000
+    STREAM_CHUNK_SIZE = 16384
 
-    def __init__(self):
+    def __init__(self, recorder: Optional[SessionRecorder] = None):
+        self.recorder = recorder
         self.timeout = config.getfloat("CONNECTION", "Timeout")
         self.search_service = config.get("SEARCH", "Service")
 
@@ -34,6 +355,16 @@ class Searcher:
         # without depending on search_service being set correctly
         self.search_session = aiohttp.ClientSession()
 
+        # service: (page function, results per page, maximum total results)
+        self.search_pages = {
+            "Google": (
+                self.get_google_page,
+                self.GOOGLE_PAGE_SIZE,
+                self.GOOGLE_MAX_RESULTS,
+            ),
+            "Bing": (self.get_bing_page, self.BING_PAGE_SIZE, self.BING_MAX_RESULTS),
+        }
+
         if self.search_service == "Bing":
             self.search_func = self.get_bing_links
         elif self.search_service == "Google":
@@ -45,41 +376,433 @@ class Searcher:
 
         client_timeout = aiohttp.ClientTimeout(total=self.timeout)
         self.fetch_session = aiohttp.ClientSession(
-            headers=Searcher.HEADERS, timeout=client_timeout
+            headers={**Searcher.HEADERS, "Accept-Encoding": ACCEPT_ENCODING},
+            timeout=client_timeout,
         )
+        self.fetch_stats = {
+            "pages": 0,
+            "bytes_received": 0,
+            "bytes_decoded": 0,
+            "decode_time": 0.0,
+        }
         self.logger = logging.getLogger(__name__)
 
+        domain_stats_file = config.get("FETCH", "DomainStatsFile")
+        if domain_stats_file and not os.path.isabs(domain_stats_file):
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            domain_stats_file = os.path.join(script_dir, domain_stats_file)
+
+        self.domain_tracker = DomainTracker(
+            domain_stats_file,
+            alpha=config.getfloat("FETCH", "DomainStatsSmoothing"),
+            failure_threshold=config.getfloat("FETCH", "CircuitBreakerFailureRate"),
+            min_requests=config.getint("FETCH", "CircuitBreakerMinRequests"),
+            cooldown=config.getfloat("FETCH", "CircuitBreakerCooldown"),
+        )
+        self.domain_tracker.load()
+
+        self.single_flight = SingleFlight()
+        # decoded text of streamed fetches in flight
+        self.text_streams: Dict[asyncio.Future, TextStream] = {}
+
     async def close(self) -> None:
         await self.fetch_session.close()
         await self.search_session.close()
+        self.domain_tracker.save()
+        self.logger.debug(
+            f"Coalesced {self.single_flight.coalesced} duplicate requests"
+        )
+        self.logger.debug(
+            f'Fetched {self.fetch_stats["pages"]} pages, '
+            f'{self.fetch_stats["bytes_received"]} bytes received for '
+            f'{self.fetch_stats["bytes_decoded"]} bytes of content, '
+            f'decoding took {round(self.fetch_stats["decode_time"], 3)} seconds'
+        )
 
     async def fetch(self, url: str) -> str:
+        """
+        Returns the text of url, empty string if it could not be fetched.
+        Concurrent fetches of the same URL share one request.
+        """
+        return await self.single_flight.run(("fetch", url), lambda: self._fetch(url))
+
+    async def fetch_visible_text(self, url: str) -> str:
+        """
+        Returns the visible text of url (see html_to_visible_text).
+        Concurrent calls for the same URL share one request and one parse.
+        """
+
+        async def fetch_and_parse() -> str:
+            html = await self.fetch(url)
+            return self.html_to_visible_text(html) if html else ""
+
+        return await self.single_flight.run(("text", url), fetch_and_parse)
+
+    async def _fetch(self, url: str) -> str:
+        async def read(response: aiohttp.ClientResponse) -> Tuple[str, str]:
+            body = await response.read()
+            text = self.decode_response(url, response, body)
+            return text, text
+
+        return await self._request(url, read)
+
+    async def _request(
+        self,
+        url: str,
+        read: Callable[[aiohttp.ClientResponse], Awaitable[Tuple[str, str]]],
+    ) -> str:
+        """
+        Requests url and records the outcome in the domain tracker and recorder.
+        :param url: URL to request
+        :param read: Coroutine function reading a successful response,
+        returns a tuple of (result, decoded HTML to record)
+        :return: Result of read, empty string if url could not be fetched
+        """
+        start_time = perf_counter()
         try:
             async with self.fetch_session.get(url, timeout=self.timeout) as response:
-                return await response.text()
+                if response.status >= 400:
+                    self.logger.error(f"Server returned {response.status} for {url}")
+                    self.domain_tracker.record_error(url)
+                    self.record_fetch(url, start_time, status=response.status)
+                    return ""
+
+                result, html = await read(response)
+                self.domain_tracker.record_success(url, perf_counter() - start_time)
+                self.record_fetch(url, start_time, status=response.status, text=html)
+                return result
         except asyncio.TimeoutError:
             self.logger.error(f"Server timeout to {url}")
+            self.domain_tracker.record_timeout(url)
+            self.record_fetch(url, start_time, error="timeout")
         except Exception as e:
             self.logger.error(f"Server error to {url}")
             self.logger.error(e)
+            self.domain_tracker.record_error(url)
+            self.record_fetch(url, start_time, error=str(e))
 
         return ""
 
+    def decode_response(
+        self, url: str, response: aiohttp.ClientResponse, body: bytes
+    ) -> str:
+        """
+        Decodes a response body and records the bytes saved by compression
+        and the decode time in fetch_stats.
+        """
+        decode_start_time = perf_counter()
+
+        content_encoding = response.headers.get("Content-Encoding", "").lower()
+        received = len(body)
+        if content_encoding == "zstd" and body.startswith(ZSTD_MAGIC):
+            # older versions of aiohttp pass zstd bodies through undecoded
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        elif content_encoding and response.content_length is not None:
+            received = response.content_length
+
+        text, charset = decode_html(body, response.charset)
+        self.add_fetch_stats(
+            url,
+            content_encoding,
+            received,
+            len(body),
+            charset,
+            perf_counter() - decode_start_time,
+        )
+        return text
+
+    def add_fetch_stats(
+        self,
+        url: str,
+        content_encoding: str,
+        received: int,
+        decoded: int,
+        charset: str,
+        decode_time: float,
+    ) -> None:
+        self.fetch_stats["pages"] += 1
+        self.fetch_stats["bytes_received"] += received
+        self.fetch_stats["bytes_decoded"] += decoded
+        self.fetch_stats["decode_time"] += decode_time
+        self.logger.debug(
+            f"{url}: {received} bytes received, {decoded - received} saved by "
+            f"{content_encoding or 'no'} compression, decoded as {charset} "
+            f"in {round(decode_time * 1000, 2)} ms"
+        )
+
+    async def stream_visible_text(
+        self, url: str, on_text: Callable[[str], Awaitable[None]]
+    ) -> str:
+        """
+        Fetches url in chunks and extracts its visible text while the body
+        downloads, so it can be scored before the download finishes.
+        Concurrent calls for the same URL share one request, pieces that
+        arrived before a call joined are replayed to it.
+        :param url: URL to fetch
+        :param on_text: Coroutine function awaited with each new piece of visible text
+        :return: Visible text of url, empty string if it could not be fetched
+        """
+        key = ("stream", url)
+        stream = TextStream()
+        task = self.single_flight.start(
+            key, lambda: self._stream_visible_text(url, stream)
+        )
+        if self.text_streams.setdefault(task, stream) is stream:
+            task.add_done_callback(lambda _: stream.close())
+            task.add_done_callback(self.text_streams.pop)
+        else:
+            stream = self.text_streams[task]
+
+        replay = asyncio.ensure_future(stream.replay(on_text))
+        try:
+            text = await self.single_flight.wait(key, task)
+            await replay
+            return text
+        finally:
+            replay.cancel()
+
+    async def _stream_visible_text(self, url: str, stream: TextStream) -> str:
+        async def read(response: aiohttp.ClientResponse) -> Tuple[str, str]:
+            content_encoding = response.headers.get("Content-Encoding", "").lower()
+            decoder = StreamingHtmlDecoder(response.charset, content_encoding)
+            parser = VisibleTextParser()
+            html_pieces = []
+            text_pieces = []
+            decode_time = 0.0
+
+            def add_html(html: str, final: bool = False) -> None:
+                html_pieces.append(html)
+                text = parser.close_text() if final else parser.feed_text(html)
+                if text:
+                    text_pieces.append(text)
+                    stream.add(text)
+
+            async for chunk in response.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+                decode_start_time = perf_counter()
+                html = decoder.decode(chunk)
+                decode_time += perf_counter() - decode_start_time
+                add_html(html)
+
+            decode_start_time = perf_counter()
+            html = decoder.decode(b"", final=True)
+            decode_time += perf_counter() - decode_start_time
+            add_html(html)
+            add_html("", final=True)
+
+            received = decoder.bytes_read
+            if (
+                content_encoding
+                and not decoder.zstd_decoded
+                and response.content_length is not None
+            ):
+                received = response.content_length
+            self.add_fetch_stats(
+                url,
+                content_encoding,
+                received,
+                decoder.bytes_decoded,
+                decoder.charset,
+                decode_time,
+            )
+
+            html = "".join(html_pieces)
+            return "".join(text_pieces) if html else "", html
+
+        return await self._request(url, read)
+
+    def record_fetch(self, url: str, start_time: float, **fields) -> None:
+        if self.recorder is not None:
+            self.recorder.record(
+                "fetch", url=url, elapsed=perf_counter() - start_time, **fields
+            )
+
     # no typing info for return value because https://github.com/python/typeshed/issues/2652
     async def fetch_multiple(self, urls: Iterable[str]):
         coroutines = [self.fetch(url) for url in urls]
         responses = await asyncio.gather(*coroutines)
         return responses
 
+    async def fetch_fastest(
+        self,
+        urls: Union[Iterable[str], AsyncIterator[List[Tuple[int, str]]]],
+        num_to_keep: int,
+        visible_text: bool = False,
+        fetch_func: Optional[Callable[[str], Awaitable[str]]] = None,
+        stop: Optional[asyncio.Event] = None,
+        ranks: Optional[Dict[str, int]] = None,
+    ) -> List[Tuple[str, str]]:
+        """
+        Fetches all URLs whose domain is not circuit broken at the same time and
+        keeps the first num_to_keep non-empty responses, cancelling the rest.
+        URLs may also be streamed in batches of (rank, url) tuples (see
+        stream_search_links), in which case each batch is fetched as soon as it
+        arrives. A URL that is streamed again only has its rank updated.
+        :param urls: URLs in rank order or async iterator of ranked URL batches,
+        should be more than num_to_keep
+        :param num_to_keep: Maximum number of responses to return
+        :param visible_text: If True, return visible text instead of the response
+        :param fetch_func: Coroutine function fetching a URL, overrides visible_text
+        :param stop: If set while fetching, cancel the remaining fetches and return early
+        :param ranks: If given, filled with the best rank of every URL fetched
+        :return: List of (url, response text) tuples, in rank order
+        """
+        if fetch_func is None:
+            fetch_func = self.fetch_visible_text if visible_text else self.fetch
+        if not hasattr(urls, "__anext__"):
+            urls = single_batch(list(enumerate(urls)))
+        if ranks is None:
+            ranks = {}
+
+        fetch_tasks = {}
+        responses = {}
+
+        next_batch = asyncio.ensure_future(urls.__anext__())
+        pending = {next_batch}
+        stop_task = None
+        if stop is not None:
+            stop_task = asyncio.ensure_future(stop.wait())
+            pending.add(stop_task)
+
+        try:
+            while pending - {stop_task} and len(responses) < num_to_keep:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task is stop_task:
+                        continue
+                    if task is not next_batch:
+                        if task.result():
+                            responses[fetch_tasks[task]] = task.result()
+                        continue
+
+                    try:
+                        batch = task.result()
+                    except StopAsyncIteration:
+                        continue
+
+                    for rank, url in batch:
+                        if url in ranks:
+                            ranks[url] = min(ranks[url], rank)
+                            continue
+                        if not self.domain_tracker.is_available(url):
+                            self.logger.debug(f"Skipping circuit broken link {url}")
+                            continue
+
+                        ranks[url] = rank
+                        fetch_task = asyncio.ensure_future(fetch_func(url))
+                        fetch_tasks[fetch_task] = url
+                        pending.add(fetch_task)
+
+                    next_batch = asyncio.ensure_future(urls.__anext__())
+                    pending.add(next_batch)
+
+                if stop is not None and stop.is_set():
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            # let a cancelled batch request unwind the iterator before closing it
+            await asyncio.wait([next_batch])
+            await urls.aclose()
+
+        num_cancelled = len(pending - {next_batch, stop_task})
+        if num_cancelled:
+            self.logger.debug(f"Cancelled {num_cancelled} slower fetches")
+
+        return [(url, responses[url]) for url in sorted(responses, key=ranks.get)][
+            :num_to_keep
+        ]
+
     async def get_search_links(self, query: str, num_results: int) -> List[str]:
         return await self.search_func(query, num_results)
 
+    async def stream_search_links(
+        self, query: str, num_results: int
+    ) -> AsyncIterator[List[Tuple[int, str]]]:
+        """
+        Requests all result pages needed for num_results at the same time and
+        yields the links of each page with their rank as soon as it arrives.
+        A link is yielded again if a page arriving later ranks it higher.
+        :param query: Search query
+        :param num_results: Number of results to request
+        :return: Async iterator over lists of (rank, link) tuples
+        """
+        _, page_size, max_results = self.search_pages[self.search_service]
+        ranges = page_ranges(min(num_results, max_results), page_size)
+
+        async def get_ranked_page(offset: int, count: int) -> List[Tuple[int, str]]:
+            # a failed page must not stop the links of the other pages
+            try:
+                page = await self._get_page(self.search_service, query, offset, count)
+            except Exception as e:
+                self.logger.error(
+                    f"{self.search_service} search failed for results "
+                    f"{offset + 1} to {offset + count}"
+                )
+                self.logger.error(e)
+                return []
+            return list(enumerate(page, offset))
+
+        page_tasks = [
+            asyncio.ensure_future(get_ranked_page(offset, count))
+            for offset, count in ranges
+        ]
+
+        best_ranks = {}
+        try:
+            for next_page in asyncio.as_completed(page_tasks):
+                links = []
+                for rank, link in await next_page:
+                    if rank < best_ranks.get(link, float("inf")):
+                        best_ranks[link] = rank
+                        links.append((rank, link))
+                if links:
+                    yield links
+        finally:
+            for task in page_tasks:
+                task.cancel()
+
+    async def _get_links(self, service: str, query: str, num_results: int) -> List[str]:
+        _, page_size, max_results = self.search_pages[service]
+        if num_results > max_results:
+            self.logger.warning(
+                f"{service} returns at most {max_results} results, "
+                f"requested {num_results}"
+            )
+
+        pages = await asyncio.gather(
+            *(
+                self._get_page(service, query, offset, count)
+                for offset, count in page_ranges(
+                    min(num_results, max_results), page_size
+                )
+            )
+        )
+        return merge_links(pages)[:num_results]
+
+    async def _get_page(
+        self, service: str, query: str, offset: int, count: int
+    ) -> List[str]:
+        page_func = self.search_pages[service][0]
+        return await self.single_flight.run(
+            ("search", service, query, offset, count),
+            lambda: page_func(query, offset, count),
+        )
+
     async def get_google_links(self, query: str, num_results: int) -> List[str]:
+        return await self._get_links("Google", query, num_results)
+
+    async def get_bing_links(self, query: str, num_results: int) -> List[str]:
+        return await self._get_links("Bing", query, num_results)
+
+    async def get_google_page(self, query: str, offset: int, count: int) -> List[str]:
         search_params = {
             "key": self.google_api_key,
             "cx": self.google_cse_id,
             "q": query,
-            "num": num_results,
+            "num": count,
+            "start": offset + 1,
         }
 
         async with self.search_session.get(
@@ -88,19 +811,32 @@ class Searcher:
             resp_status = resp.status
             resp_data = await resp.json()
 
+            if self.recorder is not None:
+                self.recorder.record(
+                    "search",
+                    service="Google",
+                    params={"q": query, "num": count, "start": offset + 1},
+                    status=resp_status,
+                    data=resp_data,
+                )
+
             if resp_status != 200:
                 logging.error(f"Google search failed with status code {resp_status}")
                 logging.error(resp_data)
                 return []
 
-        self.logger.debug(f"google: {query}, n={num_results}")
+        self.logger.debug(f"google: {query}, n={count}, start={offset + 1}")
         self.logger.debug(resp_data)
 
-        return [item["link"] for item in resp_data["items"]]
+        return [item["link"] for item in resp_data.get("items", [])]
 
-    async def get_bing_links(self, query: str, num_results: int) -> List[str]:
+    async def get_bing_page(self, query: str, offset: int, count: int) -> List[str]:
         # why does Bing consistently deliver 1 fewer result than requested?
-        search_params = {"q": query, "count": num_results + 1}
+        search_params = {
+            "q": query,
+            "count": min(count + 1, self.BING_PAGE_SIZE),
+            "offset": offset,
+        }
 
         async with self.search_session.get(
             self.BING_ENDPOINT, params=search_params, headers=self.bing_headers
@@ -108,15 +844,24 @@ class Searcher:
             resp_status = resp.status
             resp_data = await resp.json()
 
+            if self.recorder is not None:
+                self.recorder.record(
+                    "search",
+                    service="Bing",
+                    params=search_params,
+                    status=resp_status,
+                    data=resp_data,
+                )
+
             if resp_status != 200:
                 logging.error(f"Bing search failed with status code {resp_status}")
                 logging.error(resp_data)
                 return []
 
-        self.logger.debug(f"bing: {query}, n={num_results}")
+        self.logger.debug(f"bing: {query}, n={count}, offset={offset}")
         self.logger.debug(resp_data)
 
-        return [item["url"] for item in resp_data["webPages"]["value"]]
+        return [item["url"] for item in resp_data.get("webPages", {}).get("value", [])]
 
     @staticmethod
     def html_to_visible_text(html):
@@ -0,0 +1,70 @@
+from typing import Dict
+
+
+class TokenNormalizer:
+    """
+    Maps words to a common form so that plurals and possessives match each
+    other, e.g. "Books", "book" and "book's", or "cities" and "city".
+    Only plural and possessive endings are removed, so unrelated words that
+    share a prefix (e.g. "general" and "generation") are kept apart.
+    Stems are memoized since the same words appear on page after page.
+    Safe to share between executor threads: the table is only read with get()
+    and replaced rather than cleared when it gets too large.
+    """
+
+    MAX_TABLE_SIZE = 500_000
+
+    def __init__(self):
+        self.stem_table: Dict[str, str] = {}
+
+    def stem(self, token: str) -> str:
+        """
+        Returns the stem of a single token.
+        :param token: Word to stem, may end in a possessive 's or s'
+        :return: Lowercase stem of the word
+        """
+        stem_table = self.stem_table
+        stem = stem_table.get(token)
+        if stem is None:
+            if len(stem_table) >= self.MAX_TABLE_SIZE:
+                # other threads may still be reading the old table
+                stem_table = self.stem_table = {}
+
+            word = token.lower()
+            if word.endswith("'s"):
+                word = word[:-2]
+            elif word.endswith("s'"):
+                word = word[:-1]
+            stem = self.strip_plural(word)
+            stem_table[token] = stem
+        return stem
+
+    @staticmethod
+    def strip_plural(word: str) -> str:
+        """
+        Removes a plural ending like Harman's S stemmer. Words of up to three
+        letters are kept as they are, so "gas" and "yes" are not changed.
+        :param word: Lowercase word
+        :return: Singular form of the word
+        """
+        if len(word) <= 3:
+            return word
+        if word.endswith("ies") and not word.endswith(("aies", "eies")):
+            return word[:-3] + "y"
+        if word.endswith("es") and not word.endswith(("aes", "ees", "oes")):
+            return word[:-1]
+        if word.endswith("s") and not word.endswith(("us", "ss")):
+            return word[:-1]
+        return word
+
+    def normalize(self, text: str) -> str:
+        """
+        Converts whitespace separated text into a stream of stems.
+        The result is padded with spaces so a term can be counted with
+        str.count(f" {term} ") at the start and end of the text as well.
+        :param text: Text to normalize
+        :return: Stems separated by single spaces, with a leading and trailing space
+        """
+        lookup = self.stem_table.get
+        stems = [lookup(token) or self.stem(token) for token in text.split()]
+        return f" {' '.join(stems)} "
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+
+from hackq_trivia.batch_eval import (
+    BatchQuestion,
+    BatchResult,
+    load_questions,
+    percentile,
+    summarize,
+)
+
+
+class BatchEvalTest(unittest.TestCase):
+    def write_jsonl(self, entries) -> str:
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(fd, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.write("\n")
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_load_questions(self):
+        path = self.write_jsonl(
+            [
+                {"question": "Which is a fruit?", "choices": ["Apple", "Rock"]},
+                {
+                    "question": "Which is a piñata?",
+                    "choices": ["Piñata", "Trifecta"],
+                    "answer": "Piñata",
+                },
+            ]
+        )
+        questions = load_questions(path)
+        self.assertEqual(len(questions), 2)
+        self.assertIsNone(questions[0].answer)
+        self.assertEqual(questions[1].choices, ["Pinata", "Trifecta"])
+        self.assertEqual(questions[1].answer, "Pinata")
+
+    def test_load_questions_bad_answer(self):
+        path = self.write_jsonl(
+            [{"question": "Q?", "choices": ["A", "B"], "answer": "C"}]
+        )
+        with self.assertRaises(ValueError):
+            load_questions(path)
+
+    def test_percentile(self):
+        self.assertEqual(percentile([3.0, 1.0, 2.0], 50), 2.0)
+        self.assertEqual(percentile([1.0, 2.0], 50), 1.5)
+        self.assertEqual(percentile([5.0], 99), 5.0)
+
+    def test_summarize(self):
+        graded = BatchQuestion("Q1?", ["A.B", "C"], "A.B")
+        ungraded = BatchQuestion("Q2?", ["D", "E"])
+        results = [
+            BatchResult(graded, ["AB", ""], 1.0),
+            BatchResult(ungraded, ["D", "E"], 3.0),
+        ]
+        summary = summarize(
+            results, ["method1", "method2"], lambda c: c.replace(".", ""), 2.0
+        )
+
+        self.assertEqual(summary["questions"], 2)
+        self.assertEqual(summary["graded"], 1)
+        self.assertEqual(summary["throughput"], 1.0)
+        self.assertEqual(summary["accuracy"]["method1"]["accuracy"], 1.0)
+        self.assertEqual(summary["accuracy"]["method2"]["correct"], 0)
+        self.assertEqual(summary["accuracy"]["method2"]["ties"], 1)
+        self.assertEqual(summary["latency"]["mean"], 2.0)
+        self.assertEqual(summary["latency"]["max"], 3.0)
+        self.assertEqual(summary["failed"], 0)
+
+    def test_summarize_failed(self):
+        question = BatchQuestion("Q?", ["A", "B"], "A")
+        results = [
+            BatchResult(question, ["A"], 1.0),
+            BatchResult(question, [], 5.0, "ClientError: boom"),
+        ]
+        summary = summarize(results, ["method1"], lambda c: c, 2.0)
+
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["accuracy"]["method1"]["correct"], 1)
+        self.assertEqual(summary["accuracy"]["method1"]["accuracy"], 0.5)
+        self.assertEqual(summary["latency"]["max"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
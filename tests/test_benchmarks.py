@@ -0,0 +1,22 @@
+import unittest
+
+from benchmarks.corpora import build_corpora
+from benchmarks.run import compare
+
+
+class BenchmarkRunnerTest(unittest.TestCase):
+    def test_compare(self):
+        baseline = {"a": 1.0, "b": 1.0}
+        results = {"a": 1.2, "b": 1.3, "c": 5.0}
+        regressions = compare(results, baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("b:"))
+
+    def test_corpora_deterministic(self):
+        self.assertEqual(
+            build_corpora(seed=1)["frames"], build_corpora(seed=1)["frames"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import random
+import unittest
+
+from hackq_trivia.dedup import find_near_duplicates, fingerprint, similarity
+
+
+def random_text(rng: random.Random, num_words: int) -> str:
+    words = [f"word{i}" for i in range(2000)]
+    return " ".join(rng.choice(words) for _ in range(num_words))
+
+
+class DedupTest(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = random.Random(0)
+        self.article = random_text(rng, 3000)
+        self.other = random_text(rng, 3000)
+        # a mirror with a different header and footer
+        self.mirror = f"home news sports {self.article} copyright 2020 all rights"
+
+    def test_similarity(self):
+        article = fingerprint(self.article)
+        self.assertEqual(similarity(article, article), 1.0)
+        self.assertGreater(similarity(article, fingerprint(self.mirror)), 0.9)
+        self.assertLess(similarity(article, fingerprint(self.other)), 0.1)
+
+    def test_empty_text_never_duplicate(self):
+        self.assertEqual(fingerprint(""), [])
+        self.assertEqual(similarity(fingerprint(""), fingerprint("")), 0.0)
+        self.assertEqual(find_near_duplicates(["", ""], 0.9), [])
+
+    def test_short_text(self):
+        self.assertEqual(similarity(fingerprint("a b"), fingerprint("a b")), 1.0)
+        self.assertEqual(similarity(fingerprint("a b"), fingerprint("a c")), 0.0)
+
+    def test_find_near_duplicates_keeps_first(self):
+        texts = [self.article, self.other, self.mirror, self.article]
+        self.assertEqual(find_near_duplicates(texts, 0.9), [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from hackq_trivia.domain_stats import DomainTracker, url_domain
+
+
+class DomainTrackerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tracker = DomainTracker(
+            None, alpha=0.5, failure_threshold=0.6, min_requests=3, cooldown=60
+        )
+
+    def test_url_domain(self):
+        self.assertEqual(url_domain("https://www.Example.com/a?b=c"), "example.com")
+        self.assertEqual(
+            url_domain("http://en.wikipedia.org/wiki/X"), "en.wikipedia.org"
+        )
+
+    def test_latency_ewma(self):
+        self.tracker.record_success("http://a.com/1", 1.0)
+        self.tracker.record_success("http://a.com/2", 2.0)
+        self.assertAlmostEqual(self.tracker.stats["a.com"].latency, 1.5)
+        self.assertEqual(self.tracker.stats["a.com"].requests, 2)
+
+    def test_circuit_breaker(self):
+        url = "http://slow.com/page"
+        self.tracker.record_timeout(url)
+        self.tracker.record_error(url)
+        self.assertTrue(self.tracker.is_available(url))
+
+        self.tracker.record_timeout(url)
+        self.assertFalse(self.tracker.is_available(url))
+        self.assertTrue(self.tracker.is_available("http://fast.com/page"))
+
+        opened_at = self.tracker.stats["slow.com"].opened_at
+        with mock.patch("hackq_trivia.domain_stats.time", return_value=opened_at + 61):
+            self.assertTrue(self.tracker.is_available(url))
+
+        self.tracker.record_success(url, 0.5)
+        self.assertTrue(self.tracker.is_available(url))
+
+    def test_half_open_failure_reopens(self):
+        url = "http://slow.com/page"
+        self.tracker._get(url).opened_at = 0.0
+        self.assertTrue(self.tracker.is_available(url))
+
+        self.tracker.record_error(url)
+        self.assertFalse(self.tracker.is_available(url))
+
+    def test_save_load(self):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        self.tracker.path = path
+        self.tracker.record_success("http://a.com", 0.25)
+        self.tracker.record_usefulness("http://a.com", 0.5)
+        self.tracker.save()
+
+        loaded = DomainTracker(
+            path, alpha=0.5, failure_threshold=0.6, min_requests=3, cooldown=60
+        )
+        loaded.load()
+        self.assertEqual(loaded.stats["a.com"].latency, 0.25)
+        self.assertEqual(loaded.stats["a.com"].usefulness, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
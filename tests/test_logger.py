@@ -1,3 +1,8 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
 import unittest
 import logging
 
@@ -12,6 +17,39 @@ class MyTestCase(unittest.TestCase):
     def test_emojis(self):
         self.logger.info("👁 👃🏾👄👁")
 
+    def test_scoring_logged(self):
+        # a fresh interpreter, so scoring is imported before the logger is
+        # configured just like in hq_main
+        script = textwrap.dedent("""
+            import sys
+            from hackq_trivia.config import config
+            from hackq_trivia.hq_main import init_root_logger
+            from hackq_trivia.scoring import ScoringContext, method1
+
+            class FakeQuestionHandler:
+                @staticmethod
+                def search_term(phrase, match_variants=None):
+                    return f" {phrase.lower()} "
+
+            config.set("LOGGING", "File", sys.argv[1])
+            init_root_logger()
+            method1(ScoringContext([" a a b "], ["A", "B"], [["A"], ["B"]],
+                                   False, FakeQuestionHandler))
+            """)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_file = os.path.join(tmp_dir, "data.log")
+            result = subprocess.run(
+                [sys.executable, "-c", script, log_file],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            with open(log_file) as f:
+                log = f.read()
+
+        self.assertIn("method1: {'A': 2, 'B': 1}", result.stdout)
+        self.assertIn("method1: {'A': 2, 'B': 1}", log)
+
 
 if __name__ == "__main__":
     unittest.main()
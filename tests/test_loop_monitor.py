@@ -0,0 +1,75 @@
+import asyncio
+import time
+import unittest
+
+from hackq_trivia.config import config
+from hackq_trivia.loop_monitor import LoopLagMonitor
+
+
+class LoopLagMonitorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.old_enabled = config.get("MONITOR", "Enabled")
+        config.set("MONITOR", "Enabled", "True")
+        self.monitor = LoopLagMonitor()
+        self.monitor.interval = 0.01
+        self.monitor.stall_threshold = 0.1
+        self.monitor.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.monitor.stop()
+        config.set("MONITOR", "Enabled", self.old_enabled)
+
+    async def test_stall_tagged_with_stage(self):
+        await asyncio.sleep(0.02)
+        with self.monitor.stage("score"):
+            time.sleep(0.2)
+        await asyncio.sleep(0.02)
+
+        stalls = self.monitor.pop_stalls()
+        self.assertEqual(len(stalls), 1)
+        self.assertGreaterEqual(stalls[0].duration, 0.1)
+        self.assertIn("score", stalls[0].stage.split("/"))
+        self.assertEqual(self.monitor.pop_stalls(), [])
+
+    async def test_no_stall(self):
+        with self.monitor.stage("fetch"):
+            await asyncio.sleep(0.05)
+        self.assertEqual(self.monitor.pop_stalls(), [])
+
+    async def test_log_stalls(self):
+        with self.monitor.stage("parse"):
+            time.sleep(0.15)
+        await asyncio.sleep(0.02)
+
+        with self.assertLogs("hackq_trivia.loop_monitor", "INFO") as log_cm:
+            self.monitor.log_stalls()
+        self.assertIn("parse", log_cm.output[0])
+
+    async def test_concurrent_stages(self):
+        async def question():
+            with self.monitor.stage("search/fetch"):
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(question(), question())
+        self.assertEqual(self.monitor.current_stage, "idle")
+        # start a new tick so the stall isn't tagged with the finished stages
+        await asyncio.sleep(0.05)
+
+        with self.monitor.stage("score"):
+            time.sleep(0.15)
+        await asyncio.sleep(0.02)
+        self.assertEqual(self.monitor.pop_stalls()[0].stage, "score")
+
+    async def test_stop_restores_debug(self):
+        await self.monitor.stop()
+        loop = asyncio.get_event_loop()
+        debug = loop.get_debug()
+        self.monitor.slow_callbacks = True
+        self.monitor.start()
+        self.assertTrue(loop.get_debug())
+        await self.monitor.stop()
+        self.assertEqual(loop.get_debug(), debug)
+
+
+if __name__ == "__main__":
+    unittest.main()
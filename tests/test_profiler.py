@@ -0,0 +1,75 @@
+import asyncio
+import os
+import pstats
+import tempfile
+import unittest
+
+from hackq_trivia.config import config
+from hackq_trivia.profiler import QuestionProfiler, run_in_executor
+
+
+def worker_sum(n: int) -> int:
+    return sum(range(n))
+
+
+class QuestionProfilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.old_enabled = config.get("PROFILING", "Enabled")
+        self.old_dir = config.get("PROFILING", "Directory")
+        self.profile_dir = tempfile.mkdtemp()
+        config.set("PROFILING", "Directory", self.profile_dir)
+
+    def tearDown(self) -> None:
+        config.set("PROFILING", "Enabled", self.old_enabled)
+        config.set("PROFILING", "Directory", self.old_dir)
+        for name in os.listdir(self.profile_dir):
+            os.remove(os.path.join(self.profile_dir, name))
+        os.rmdir(self.profile_dir)
+
+    def test_disabled(self):
+        config.set("PROFILING", "Enabled", "False")
+        profiler = QuestionProfiler()
+        with profiler.profile(1):
+            sum(range(1000))
+
+        self.assertEqual(os.listdir(self.profile_dir), [])
+        self.assertEqual(profiler.summary(), "")
+
+    def test_enabled(self):
+        config.set("PROFILING", "Enabled", "True")
+        profiler = QuestionProfiler()
+        for question_num in (1, 2, 2):
+            with profiler.profile(question_num):
+                sorted(str(i) for i in range(1000))
+
+        session = profiler.session
+        self.assertEqual(
+            sorted(os.listdir(self.profile_dir)),
+            [
+                f"{session}-question1.prof",
+                f"{session}-question2-2.prof",
+                f"{session}-question2.prof",
+            ],
+        )
+        self.assertEqual(len(set(profiler.profile_files)), 3)
+        self.assertIn("sorted", profiler.summary())
+
+    def test_executor_calls_profiled(self):
+        config.set("PROFILING", "Enabled", "True")
+        profiler = QuestionProfiler()
+
+        async def answer_question():
+            with profiler.profile(1):
+                return await run_in_executor(worker_sum, 1000)
+
+        self.assertEqual(asyncio.run(answer_question()), sum(range(1000)))
+        # run outside of a profiled question
+        self.assertEqual(asyncio.run(run_in_executor(worker_sum, 10)), 45)
+
+        stats = pstats.Stats(*profiler.profile_files).stats
+        self.assertIn("worker_sum", {name for _, _, name in stats})
+        self.assertEqual(len(profiler.profile_files), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
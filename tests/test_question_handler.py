@@ -1,12 +1,16 @@
 import asyncio
 import unittest
 
+from aiohttp import web
+
 from hackq_trivia.question_handler import QuestionHandler
+from hackq_trivia.scoring import IncrementalScorer
 
 
 class MyTestCase(unittest.TestCase):
     async def setUpAsync(self):
         self.qh = QuestionHandler()
+        self.qh.searcher.domain_tracker.path = None
 
     def setUp(self) -> None:
         self.loop = asyncio.get_event_loop()
@@ -27,6 +31,20 @@ class MyTestCase(unittest.TestCase):
             ["love", "The Scarlet Letter"],
         )
 
+    def test_variants_collide(self):
+        def groups(*choices):
+            return [[choice] for choice in choices]
+
+        self.assertTrue(self.qh.variants_collide(groups("News", "New")))
+        self.assertTrue(self.qh.variants_collide(groups("Book", "Books")))
+        self.assertFalse(self.qh.variants_collide(groups("University", "Universe")))
+        self.assertFalse(self.qh.variants_collide(groups("Book", "Pen")))
+        # exact terms for colliding choices differ
+        self.assertNotEqual(
+            self.qh.search_term("News", False),
+            self.qh.search_term("New", False),
+        )
+
     def test_answer_question(self):
         self.loop.run_until_complete(
             self.qh.answer_question(
@@ -37,5 +55,82 @@ class MyTestCase(unittest.TestCase):
         )
 
 
+class FetchAndScoreTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        async def long_page(request):
+            response = web.StreamResponse(headers={"Content-Type": "text/html"})
+            await response.prepare(request)
+            await response.write(b"<p>" + b"paris london " * 100 + b"paris " * 500)
+            await asyncio.sleep(5)
+            await response.write(b"</p>")
+            return response
+
+        async def short_page(_):
+            return web.Response(
+                text="<p>" + "paris london " * 1000 + "</p>", content_type="text/html"
+            )
+
+        app = web.Application()
+        app.router.add_get("/long/{n}", long_page)
+        app.router.add_get("/short/{n}", short_page)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+        self.qh = QuestionHandler()
+        self.qh.searcher.domain_tracker.path = None
+        self.qh.num_sites = 2
+
+    async def asyncTearDown(self) -> None:
+        await self.qh.close()
+        await self.runner.cleanup()
+
+    def make_scorer(self, margin: int) -> IncrementalScorer:
+        return IncrementalScorer(
+            [["Paris", "Paris"], ["London", "London"]],
+            self.qh.search_term,
+            lambda text: self.qh.prepare_text(
+                text.translate(self.qh.punctuation_to_none)
+            ),
+            margin,
+            2,
+        )
+
+    async def fetch_and_score(self, urls, scorer):
+        async def batches():
+            yield list(enumerate(urls))
+
+        return await asyncio.wait_for(self.qh.fetch_and_score(batches(), scorer), 3)
+
+    async def test_stops_early(self):
+        urls = [f"{self.base_url}/long/{i}" for i in range(4)]
+        scorer = self.make_scorer(margin=20)
+        pages = await self.fetch_and_score(urls, scorer)
+
+        self.assertEqual(scorer.answer, "Paris")
+        # partial pages, capped at NumSitesToSearch
+        self.assertEqual([url for url, _ in pages], urls[:2])
+        for _, text in pages:
+            self.assertGreater(text.count("paris"), 100)
+        self.assertNotIn("</p>", pages[0][1])
+
+    async def test_not_decided(self):
+        urls = [f"{self.base_url}/short/{i}" for i in range(3)]
+        scorer = self.make_scorer(margin=20)
+        pages = await self.fetch_and_score(urls, scorer)
+
+        self.assertFalse(scorer.decided.is_set())
+        self.assertEqual(len(pages), 2)
+        prepared_texts = scorer.prepared_texts()
+        for url, text in pages:
+            self.assertEqual(
+                prepared_texts[url],
+                self.qh.prepare_text(" ".join(text.split())),
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,7 @@ from hackq_trivia.hq_main import init_root_logger
 
 async def test():
     qh = QuestionHandler()
+    qh.searcher.domain_tracker.path = None
     # fails because all pages say foot/footwear instead of feet
     # await qh.answer_question('In the 19th century, where were spats typically worn?',
     #                          ['Ears', 'Arms', 'Feet'])
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from hackq_trivia.recorder import SessionRecorder, read_session, session_files
+
+
+class SessionRecorderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.record_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.record_dir)
+        self.pattern = os.path.join(self.record_dir, "session{}.jsonl.gz")
+
+    def test_round_trip(self):
+        recorder = SessionRecorder(self.pattern, 1024**2)
+        recorder.record("ws", data='{"type": "question"}')
+        recorder.record("fetch", url="http://a.com", status=200, text="<p>hi</p>")
+        recorder.close()
+
+        records = list(read_session(self.pattern))
+        self.assertEqual([r["kind"] for r in records], ["start", "ws", "fetch"])
+        self.assertEqual(records[1]["data"], '{"type": "question"}')
+        self.assertEqual(records[2]["text"], "<p>hi</p>")
+        self.assertLessEqual(records[1]["t"], records[2]["t"])
+
+    def test_appends_across_restarts(self):
+        for i in range(2):
+            recorder = SessionRecorder(self.pattern, 1024**2)
+            recorder.record("ws", data=str(i))
+            recorder.close()
+
+        self.assertEqual(len(session_files(self.pattern)), 1)
+        records = list(read_session(self.pattern.format(1)))
+        self.assertEqual(
+            [r.get("data") for r in records if r["kind"] == "ws"], ["0", "1"]
+        )
+
+    def test_rotation(self):
+        recorder = SessionRecorder(self.pattern, 1)
+        for i in range(3):
+            recorder.record("ws", data=str(i))
+        recorder.close()
+
+        self.assertEqual(len(session_files(self.pattern)), 3)
+        records = [r for r in read_session(self.pattern) if r["kind"] == "ws"]
+        self.assertEqual([r["data"] for r in records], ["0", "1", "2"])
+
+    def test_truncated_file(self):
+        recorder = SessionRecorder(self.pattern, 1024**2)
+        recorder.record("ws", data="x" * 1000)
+        recorder.close()
+
+        path = self.pattern.format(1)
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 10)
+
+        with self.assertLogs("hackq_trivia.recorder", "WARNING"):
+            list(read_session(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+import unittest
+
+from hackq_trivia.scoring import (
+    SCORING_METHODS,
+    IncrementalScorer,
+    InvalidScoringMethodError,
+    ScoringContext,
+    get_best_answer,
+    get_scoring_methods,
+    scoring_method,
+)
+
+
+class FakeQuestionHandler:
+    @staticmethod
+    def search_term(phrase: str, match_variants=None) -> str:
+        return f" {phrase.lower()} "
+
+    @staticmethod
+    def find_keywords(text: str, sentences: bool = True):
+        return text.split()
+
+
+class ScoringTest(unittest.TestCase):
+    def make_context(self, texts, choices, reverse=False):
+        return ScoringContext(
+            texts,
+            choices,
+            [[choice] for choice in choices],
+            reverse,
+            FakeQuestionHandler,
+        )
+
+    def test_method1(self):
+        context = self.make_context(
+            [" red apple green apple ", " apple pie "], ["Apple", "Pie", "Red Apple"]
+        )
+        context.build(SCORING_METHODS["method1"].requires)
+        self.assertEqual(SCORING_METHODS["method1"](context), "Apple")
+        self.assertEqual(context.count_term(" red apple "), 1)
+
+    def test_method2_reverse(self):
+        context = self.make_context(
+            [" red apple green apple ", " apple pie "], ["Red Apple", "Pie"], True
+        )
+        self.assertEqual(SCORING_METHODS["method2"](context), "Pie")
+
+    def test_artifacts_shared(self):
+        context = self.make_context([" a b ", " b c "], ["A", "B"])
+        context.build(["combined_text", "token_counts"])
+        token_counts = context.artifacts["token_counts"]
+        context.build(["token_counts"])
+        self.assertIs(context.artifacts["token_counts"], token_counts)
+        self.assertEqual(context.count_term(" b "), 2)
+
+    def test_count_term_same_rule(self):
+        texts = [" uno uno uno ", "red\napple red apple red  apple"]
+        counted = self.make_context(texts, [])
+        counted.build(["token_counts"])
+        searched = self.make_context(texts, [])
+        for context in (counted, searched):
+            self.assertEqual(context.count_term(" uno "), 3)
+            self.assertEqual(context.count_term(" red "), 3)
+            self.assertEqual(context.count_term(" red apple "), 3)
+            self.assertEqual(context.count_term(" uno red "), 0)
+            # e.g. search_term("Yes ") after replacing punctuation with spaces
+            self.assertEqual(context.count_term(" red  "), 3)
+            self.assertEqual(context.count_term(" red  apple "), 3)
+
+    def test_registry(self):
+        @scoring_method("test_method", requires=["combined_text"])
+        def test_method(context):
+            return context.answers[0]
+
+        self.addCleanup(SCORING_METHODS.pop, "test_method")
+        methods = get_scoring_methods(["method1", "test_method"])
+        self.assertEqual([m.name for m in methods], ["method1", "test_method"])
+        self.assertEqual(methods[1].requires, ["combined_text"])
+
+        with self.assertRaises(InvalidScoringMethodError):
+            get_scoring_methods(["unknown"])
+
+    def test_get_best_answer(self):
+        groups = [["A", "A "], ["B", "B "]]
+        self.assertEqual(
+            get_best_answer({"A": 1, "A ": 1, "B": 1, "B ": 0}, groups), "A"
+        )
+        self.assertEqual(
+            get_best_answer({"A": 1, "A ": 0, "B": 1, "B ": 0}, groups), ""
+        )
+        self.assertEqual(
+            get_best_answer({"A": 0, "A ": 0, "B": 0, "B ": 0}, groups), ""
+        )
+
+
+class IncrementalScorerTest(unittest.IsolatedAsyncioTestCase):
+    def make_scorer(self, margin=3, min_pages=2):
+        return IncrementalScorer(
+            [["New York", "New York"], ["York", "York"], ["Boston", "Boston"]],
+            FakeQuestionHandler.search_term,
+            str.lower,
+            margin,
+            min_pages,
+        )
+
+    async def test_counts_across_chunks(self):
+        text = (
+            "new york new york new york and new\nyork, york boston boston "
+            "boston new york. newyork york"
+        )
+        context = ScoringContext([text], [], [], False, FakeQuestionHandler)
+        expected = {
+            term: context.count_term(f" {term} ")
+            for term in ("new york", "york", "boston")
+        }
+        # str.count would miss every other repeated term
+        self.assertEqual(expected, {"new york": 3, "york": 5, "boston": 3})
+        for size in range(1, len(text) + 1):
+            scorer = self.make_scorer(margin=100)
+            page = scorer.add_page("url")
+            for i in range(0, len(text), size):
+                await page.feed(text[i : i + size])
+            await page.finish()
+
+            self.assertEqual(page.text, text)
+            self.assertEqual(page.prepared_text, f" {' '.join(text.split())} ")
+            totals = scorer.totals()
+            # each group lists the same answer twice
+            self.assertEqual(totals["New York"], 2 * expected["new york"])
+            self.assertEqual(totals["York"], 2 * expected["york"])
+            self.assertEqual(totals["Boston"], 2 * expected["boston"])
+
+    async def test_decides_across_pages(self):
+        scorer = self.make_scorer()
+        first = scorer.add_page("first")
+        await first.feed("boston and boston ")
+        # leads by enough, but only on one page
+        self.assertFalse(scorer.decided.is_set())
+
+        second = scorer.add_page("second")
+        await second.feed("york and ")
+        self.assertFalse(scorer.decided.is_set())
+
+        await second.feed("boston and boston and ")
+        self.assertTrue(scorer.decided.is_set())
+        self.assertEqual(scorer.answer, "Boston")
+        self.assertEqual(
+            scorer.page_texts(2),
+            [
+                ("first", "boston and boston "),
+                ("second", "york and boston and boston and "),
+            ],
+        )
+
+    async def test_near_duplicates_do_not_decide(self):
+        scorer = IncrementalScorer(
+            [["York"], ["Boston"]],
+            FakeQuestionHandler.search_term,
+            str.lower,
+            3,
+            2,
+            0.9,
+        )
+        mirror_text = "boston beat york and boston won in boston again boston"
+        for url in ("article", "mirror"):
+            page = scorer.add_page(url)
+            await page.feed(mirror_text)
+            # unfinished pages may still turn out to be mirrors
+            self.assertFalse(scorer.decided.is_set())
+            await page.finish()
+
+        self.assertTrue(scorer.pages["mirror"].duplicate)
+        # leads by enough, but on one distinct page
+        self.assertEqual(scorer.totals(), {"York": 1, "Boston": 4})
+        self.assertFalse(scorer.decided.is_set())
+        self.assertEqual([url for url, _ in scorer.page_texts(1)], ["article"])
+
+        other = scorer.add_page("other")
+        await other.feed("boston fans celebrate another title for boston")
+        self.assertFalse(scorer.decided.is_set())
+        await other.finish()
+        self.assertFalse(other.duplicate)
+        self.assertTrue(scorer.decided.is_set())
+        self.assertEqual(scorer.answer, "Boston")
+
+    async def test_page_texts_prefers_finished(self):
+        scorer = self.make_scorer(margin=100)
+        for url in ("partial1", "finished1", "partial2", "finished2"):
+            await scorer.add_page(url).feed(f"{url} ")
+        await scorer.pages["finished1"].finish()
+        await scorer.pages["finished2"].finish()
+        scorer.add_page("empty")
+
+        urls = [url for url, _ in scorer.page_texts(3)]
+        self.assertEqual(urls, ["partial1", "finished1", "finished2"])
+
+        ranks = {"partial1": 3, "finished1": 2, "partial2": 0, "finished2": 1}
+        urls = [url for url, _ in scorer.page_texts(3, ranks)]
+        self.assertEqual(urls, ["partial2", "finished2", "finished1"])
+
+    async def test_discard_page(self):
+        scorer = self.make_scorer(margin=100)
+        await scorer.add_page("failed").feed("boston boston ")
+        scorer.discard_page("failed")
+        self.assertEqual(scorer.totals()["Boston"], 0)
+        self.assertEqual(scorer.page_texts(1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
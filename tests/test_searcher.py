@@ -1,14 +1,28 @@
+import asyncio
 import json
 import unittest
 from urllib.parse import urlparse
 import warnings
 
-from hackq_trivia.searcher import Searcher
+from aiohttp import ClientConnectionError, web
+
+from hackq_trivia.searcher import (
+    Searcher,
+    SingleFlight,
+    StreamingHtmlDecoder,
+    VisibleTextParser,
+    decode_html,
+    merge_links,
+    page_ranges,
+    sniff_charset,
+)
 
 
 class SearcherFetchTest(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self) -> None:
         self._searcher = Searcher()
+        # keep the tests from saving to the domain stats file
+        self._searcher.domain_tracker.path = None
 
     async def asyncTearDown(self) -> None:
         await self._searcher.close()
@@ -50,9 +64,401 @@ class SearcherFetchTest(unittest.IsolatedAsyncioTestCase):
         )
 
 
+class SearcherFetchFastestTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        async def delay(request):
+            await asyncio.sleep(float(request.match_info["seconds"]))
+            return web.Response(text=request.match_info["seconds"])
+
+        async def forbidden(_):
+            return web.Response(status=403, text="blocked")
+
+        async def page(_):
+            self._page_hits += 1
+            await asyncio.sleep(0.1)
+            return web.Response(
+                text="<html><head><title>T</title></head><body>Hello</body></html>",
+                content_type="text/html",
+            )
+
+        async def latin1(_):
+            body = '<meta charset="iso-8859-1"><p>Pi\xf1ata</p>'.encode("latin-1")
+            return web.Response(body=body, content_type="text/html")
+
+        async def compressed(_):
+            response = web.Response(text="<p>" + "word " * 1000 + "</p>")
+            response.enable_compression(web.ContentCoding.gzip)
+            return response
+
+        async def long_page(request):
+            response = web.StreamResponse(headers={"Content-Type": "text/html"})
+            await response.prepare(request)
+            await response.write(b"<html><body><p>" + b"answer " * 5000)
+            await asyncio.sleep(float(request.match_info["seconds"]))
+            await response.write(b"</p></body></html>")
+            return response
+
+        self._page_hits = 0
+        app = web.Application()
+        app.router.add_get("/long/{seconds}", long_page)
+        app.router.add_get("/latin1", latin1)
+        app.router.add_get("/compressed", compressed)
+        app.router.add_get("/delay/{seconds}", delay)
+        app.router.add_get("/forbidden", forbidden)
+        app.router.add_get("/page", page)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self._base_url = f"http://127.0.0.1:{port}"
+
+        self._searcher = Searcher()
+        self._searcher.domain_tracker.path = None
+
+    async def asyncTearDown(self) -> None:
+        await self._searcher.close()
+        await self._runner.cleanup()
+
+    async def test_keeps_fastest(self):
+        urls = [
+            f"{self._base_url}/delay/2",
+            f"{self._base_url}/forbidden",
+            f"{self._base_url}/delay/0.1",
+            f"{self._base_url}/delay/0",
+        ]
+        with self.assertLogs():
+            pages = await self._searcher.fetch_fastest(urls, 2)
+        self.assertEqual(pages, [(urls[2], "0.1"), (urls[3], "0")])
+
+    async def test_streamed_batches(self):
+        async def batches():
+            yield [(5, f"{self._base_url}/delay/0")]
+            await asyncio.sleep(0.1)
+            # a later batch ranks the first URL higher
+            yield [
+                (0, f"{self._base_url}/delay/0.1"),
+                (1, f"{self._base_url}/delay/0"),
+                (2, f"{self._base_url}/delay/2"),
+            ]
+
+        ranks = {}
+        pages = await self._searcher.fetch_fastest(batches(), 2, ranks=ranks)
+        self.assertEqual(
+            pages,
+            [
+                (f"{self._base_url}/delay/0.1", "0.1"),
+                (f"{self._base_url}/delay/0", "0"),
+            ],
+        )
+        self.assertEqual(ranks[f"{self._base_url}/delay/0"], 1)
+
+    async def test_stream_search_links(self):
+        async def fake_page(_, offset, count):
+            await asyncio.sleep(0.1 if offset == 0 else 0)
+            links = [f"link{min(i, 12)}" for i in range(offset, offset + count)]
+            if offset == 0:
+                links[5] = "link12"
+            return links
+
+        self._searcher.search_service = "Google"
+        self._searcher.search_pages["Google"] = (fake_page, 10, 100)
+        batches = [batch async for batch in self._searcher.stream_search_links("q", 15)]
+
+        # second page arrives first, duplicates of link12 within it are dropped
+        self.assertEqual(batches[0], [(10, "link10"), (11, "link11"), (12, "link12")])
+        # link12 is yielded again with its better rank from the first page
+        self.assertEqual(
+            batches[1],
+            [(i, f"link{i}") for i in range(5)]
+            + [(5, "link12")]
+            + [(i, f"link{i}") for i in range(6, 10)],
+        )
+
+    async def test_stream_search_links_page_fails(self):
+        async def fake_page(_, offset, count):
+            if offset == 10:
+                raise ClientConnectionError("connection reset")
+            return [f"link{i}" for i in range(offset, offset + count)]
+
+        self._searcher.search_service = "Google"
+        self._searcher.search_pages["Google"] = (fake_page, 10, 100)
+        with self.assertLogs("hackq_trivia.searcher", "ERROR"):
+            batches = [
+                batch async for batch in self._searcher.stream_search_links("q", 30)
+            ]
+
+        links = sorted(sum(batches, []))
+        self.assertEqual(
+            links, [(i, f"link{i}") for i in list(range(10)) + list(range(20, 30))]
+        )
+
+    async def test_get_links_paginated(self):
+        requests = []
+
+        async def fake_page(_, offset, count):
+            requests.append((offset, count))
+            return [f"link{i}" for i in range(offset, offset + count)]
+
+        self._searcher.search_pages["Google"] = (fake_page, 10, 100)
+        links = await self._searcher.get_google_links("q", 25)
+        self.assertEqual(links, [f"link{i}" for i in range(25)])
+        self.assertEqual(sorted(requests), [(0, 10), (10, 10), (20, 5)])
+
+    async def test_coalesces_fetches(self):
+        url = f"{self._base_url}/page"
+        texts = await asyncio.gather(
+            self._searcher.fetch_visible_text(url),
+            self._searcher.fetch_visible_text(url),
+            self._searcher.fetch(url),
+        )
+        self.assertEqual(texts[:2], ["hello", "hello"])
+        self.assertIn("Hello", texts[2])
+        self.assertEqual(self._page_hits, 1)
+        self.assertEqual(self._searcher.single_flight.coalesced, 2)
+
+    async def test_meta_charset(self):
+        text = await self._searcher.fetch(f"{self._base_url}/latin1")
+        self.assertIn("Pi\xf1ata", text)
+
+    async def test_compression_stats(self):
+        text = await self._searcher.fetch(f"{self._base_url}/compressed")
+        self.assertEqual(text.count("word"), 1000)
+        stats = self._searcher.fetch_stats
+        self.assertEqual(stats["bytes_decoded"], len(text))
+        self.assertLess(stats["bytes_received"], stats["bytes_decoded"])
+
+    async def test_stream_visible_text(self):
+        pieces = []
+
+        async def on_text(text):
+            pieces.append(text)
+
+        url = f"{self._base_url}/page"
+        text = await self._searcher.stream_visible_text(url, on_text)
+        self.assertEqual(text, "hello")
+        self.assertEqual("".join(pieces), text)
+        self.assertEqual(self._searcher.fetch_stats["pages"], 1)
+
+        text = await self._searcher.stream_visible_text(
+            f"{self._base_url}/latin1", on_text
+        )
+        self.assertEqual(text, "pinata")
+
+        with self.assertLogs():
+            text = await self._searcher.stream_visible_text(
+                f"{self._base_url}/forbidden", on_text
+            )
+        self.assertEqual(text, "")
+
+    async def test_stream_visible_text_partial(self):
+        pieces = []
+
+        async def on_text(text):
+            pieces.append(text)
+
+        task = asyncio.ensure_future(
+            self._searcher.stream_visible_text(f"{self._base_url}/long/2", on_text)
+        )
+        await asyncio.sleep(0.5)
+        # text arrives before the download finishes
+        self.assertGreater("".join(pieces).count("answer"), 1000)
+        task.cancel()
+
+    async def test_coalesces_streams(self):
+        pieces = {"first": [], "second": []}
+
+        def collect(name):
+            async def on_text(text):
+                pieces[name].append(text)
+
+            return on_text
+
+        url = f"{self._base_url}/page"
+        texts = await asyncio.gather(
+            self._searcher.stream_visible_text(url, collect("first")),
+            self._searcher.stream_visible_text(url, collect("second")),
+        )
+        self.assertEqual(texts, ["hello", "hello"])
+        self.assertEqual(pieces["first"], pieces["second"])
+        self.assertEqual(self._page_hits, 1)
+        self.assertEqual(self._searcher.single_flight.coalesced, 1)
+        self.assertEqual(self._searcher.text_streams, {})
+
+    async def test_stream_replayed_to_late_caller(self):
+        pieces = {"first": [], "late": []}
+
+        def collect(name):
+            async def on_text(text):
+                pieces[name].append(text)
+
+            return on_text
+
+        url = f"{self._base_url}/long/0.5"
+        first = asyncio.ensure_future(
+            self._searcher.stream_visible_text(url, collect("first"))
+        )
+        await asyncio.sleep(0.2)
+        self.assertTrue(pieces["first"])
+        late = asyncio.ensure_future(
+            self._searcher.stream_visible_text(url, collect("late"))
+        )
+        # the first caller leaving does not cancel the shared request
+        await asyncio.sleep(0)
+        first.cancel()
+
+        text = await late
+        self.assertEqual(text.count("answer"), 5000)
+        self.assertEqual("".join(pieces["late"]), text)
+        self.assertEqual(self._searcher.single_flight.coalesced, 1)
+
+    async def test_fetch_fastest_stop(self):
+        stop = asyncio.Event()
+
+        async def fetch_and_stop(url):
+            text = await self._searcher.fetch(url)
+            stop.set()
+            return text
+
+        urls = [f"{self._base_url}/delay/0", f"{self._base_url}/delay/2"]
+        pages = await asyncio.wait_for(
+            self._searcher.fetch_fastest(urls, 2, fetch_func=fetch_and_stop, stop=stop),
+            1,
+        )
+        self.assertEqual(pages, [(urls[0], "0")])
+
+    async def test_skips_circuit_broken(self):
+        urls = [f"{self._base_url}/delay/0"]
+        stats = self._searcher.domain_tracker._get(urls[0])
+        stats.opened_at = float("inf")
+        self.assertEqual(await self._searcher.fetch_fastest(urls, 1), [])
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_shared_result(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(
+            *(single_flight.run("key", work) for _ in range(3))
+        )
+        self.assertEqual(results, ["result"] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.coalesced, 2)
+        self.assertEqual(single_flight.in_flight, {})
+
+    async def test_cancel_one_waiter(self):
+        single_flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        first = asyncio.ensure_future(single_flight.run("key", work))
+        second = asyncio.ensure_future(single_flight.run("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, "result")
+
+    async def test_cancel_all_waiters(self):
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(10)
+
+        waiter = asyncio.ensure_future(single_flight.run("key", work))
+        await started.wait()
+        task = single_flight.in_flight["key"][0]
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(single_flight.in_flight, {})
+
+
+class DecodeHtmlTest(unittest.TestCase):
+    def test_sniff_charset(self):
+        self.assertEqual(
+            sniff_charset(b'<meta charset="windows-1252">'), "windows-1252"
+        )
+        self.assertEqual(
+            sniff_charset(
+                b'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'
+            ),
+            "Shift_JIS",
+        )
+        self.assertEqual(sniff_charset(b"\xef\xbb\xbf<p>x</p>"), "utf-8-sig")
+        self.assertIsNone(sniff_charset(b"<p>no charset</p>"))
+        self.assertIsNone(sniff_charset(b" " * 4096 + b'<meta charset="latin-1">'))
+
+    def test_decode_html(self):
+        self.assertEqual(decode_html("é".encode(), None), ("é", "utf-8"))
+        self.assertEqual(decode_html("é".encode("latin-1"), "latin-1")[0], "é")
+        self.assertEqual(decode_html(b"\xff", None)[0], "\ufffd")
+        self.assertEqual(decode_html(b"abc", "no-such-codec"), ("abc", "utf-8"))
+
+
+class StreamingTextTest(unittest.TestCase):
+    HTML = (
+        "<html><head><title>Title</title><style>p {}</style></head>"
+        "<body><script>var x = 1;</script><p>Caf&eacute; &amp; Cr\xe8me</p>"
+        "<div>Second<br/>line</div></body></html>"
+    )
+
+    def test_visible_text_parser(self):
+        parser = VisibleTextParser()
+        text = "".join(
+            parser.feed_text(self.HTML[i : i + 7]) for i in range(0, len(self.HTML), 7)
+        )
+        text += parser.close_text()
+        self.assertEqual(text, Searcher.html_to_visible_text(self.HTML))
+
+    def test_visible_text_parser_unclosed_head(self):
+        parser = VisibleTextParser()
+        text = parser.feed_text("<head><title>t</title><body><p>visible</p>")
+        self.assertEqual(text + parser.close_text(), "visible")
+
+    def test_streaming_decoder(self):
+        body = '<meta charset="utf-8"><p>\u00e9\u4e2d</p>'.encode() * 200
+        decoder = StreamingHtmlDecoder()
+        chunks = [body[i : i + 3] for i in range(0, len(body), 3)]
+        text = "".join(decoder.decode(chunk) for chunk in chunks)
+        text += decoder.decode(b"", final=True)
+        self.assertEqual(text, body.decode())
+        self.assertEqual(decoder.charset, "utf-8")
+        self.assertEqual(decoder.bytes_read, len(body))
+
+        # short bodies are buffered until the end to find the charset
+        decoder = StreamingHtmlDecoder()
+        body = '<meta charset="latin-1">\xe9'.encode("latin-1")
+        self.assertEqual(decoder.decode(body), "")
+        self.assertEqual(decoder.decode(b"", final=True), body.decode("latin-1"))
+        decoder = StreamingHtmlDecoder("no-such-codec")
+        self.assertEqual(decoder.decode(b"abc", final=True), "abc")
+
+
+class SearcherPaginationTest(unittest.TestCase):
+    def test_page_ranges(self):
+        self.assertEqual(page_ranges(5, 10), [(0, 5)])
+        self.assertEqual(page_ranges(25, 10), [(0, 10), (10, 10), (20, 5)])
+        self.assertEqual(page_ranges(0, 10), [])
+
+    def test_merge_links(self):
+        self.assertEqual(
+            merge_links([["a", "b"], ["b", "c"], ["a", "d"]]), ["a", "b", "c", "d"]
+        )
+
+
 class SearcherSearchEngineTest(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self) -> None:
         self._searcher = Searcher()
+        self._searcher.domain_tracker.path = None
 
     async def asyncTearDown(self) -> None:
         await self._searcher.close()
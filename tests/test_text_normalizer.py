@@ -0,0 +1,49 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from hackq_trivia.text_normalizer import TokenNormalizer
+
+
+class TokenNormalizerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.normalizer = TokenNormalizer()
+
+    def test_variants_share_stem(self):
+        stems = {self.normalizer.stem(word) for word in ("book", "Books", "book's")}
+        self.assertEqual(len(stems), 1)
+        self.assertEqual(self.normalizer.stem("Cities"), self.normalizer.stem("city"))
+        self.assertEqual(self.normalizer.stem("books'"), self.normalizer.stem("book"))
+
+    def test_unrelated_words_kept_apart(self):
+        for words in (
+            ("general", "generation", "generic"),
+            ("animal", "animation", "animate"),
+            ("experiment", "experience"),
+            ("communism", "community"),
+            ("gas", "ga"),
+            ("class", "clas"),
+        ):
+            stems = {self.normalizer.stem(word) for word in words}
+            self.assertEqual(len(stems), len(words), words)
+
+    def test_normalize_pads_text(self):
+        text = self.normalizer.normalize("the peninsulas  of florida")
+        self.assertTrue(text.startswith(" ") and text.endswith(" "))
+        self.assertEqual(text.count(self.normalizer.normalize("Peninsula")), 1)
+        self.assertEqual(text.count(self.normalizer.normalize("peninsulas of")), 1)
+
+    def test_stem_table_memoized(self):
+        self.normalizer.normalize("cats cats dogs")
+        self.assertEqual(set(self.normalizer.stem_table), {"cats", "dogs"})
+
+    def test_shared_between_threads(self):
+        self.normalizer.MAX_TABLE_SIZE = 50
+        text = " ".join(f"word{i}s" for i in range(2000))
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(self.normalizer.normalize, [text] * 8))
+        self.assertEqual(len(set(results)), 1)
+        self.assertLessEqual(len(self.normalizer.stem_table), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()